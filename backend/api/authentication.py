@@ -0,0 +1,42 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.authentication import TokenAuthentication
+
+TOKEN_USER_KEY = 'auth:token:{}'
+
+
+def token_cache_key(key):
+    return TOKEN_USER_KEY.format(hashlib.sha256(key.encode()).hexdigest())
+
+
+def evict_tokens(keys):
+    """
+    Убирает пользователей из кэша токенов сразу и еще раз после
+    фиксации транзакции: параллельный запрос мог успеть закэшировать
+    старые данные до коммита.
+    """
+    cache_keys = [token_cache_key(key) for key in keys]
+    if not cache_keys:
+        return
+    cache.delete_many(cache_keys)
+    transaction.on_commit(lambda: cache.delete_many(cache_keys))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication, которая хранит пользователя по токену в кэше
+    на AUTH_TOKEN_CACHE_TIMEOUT секунд. Записи сбрасываются сигналами
+    при удалении токена и при сохранении пользователя.
+    """
+    def authenticate_credentials(self, key):
+        cache_key = token_cache_key(key)
+        user = cache.get(cache_key)
+        if user is not None:
+            return user, self.get_model()(key=key, user=user)
+
+        user, token = super().authenticate_credentials(key)
+        cache.set(cache_key, user, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+        return user, token
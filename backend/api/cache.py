@@ -0,0 +1,153 @@
+import hashlib
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+CATALOG_VERSION_KEY = 'recipes:version:catalog'
+LIST_VERSION_KEY = 'recipes:version:list'
+RECIPE_VERSION_KEY = 'recipes:version:recipe:{}'
+CATALOG_DATA_VERSION_KEY = 'catalog:version:{}'
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_versions(*keys):
+    """
+    Текущие значения счетчиков версий. Отсутствующий счетчик
+    создается со значением от текущего времени, чтобы после вытеснения
+    из кэша не совпасть ни с одной из прежних версий.
+    """
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def bump_on_commit(*keys):
+    """
+    Увеличивает счетчики после фиксации транзакции, чтобы читатели
+    не закэшировали под новой версией еще не записанные данные.
+    """
+    transaction.on_commit(lambda: [bump_version(key) for key in keys])
+
+
+def invalidate_catalog():
+    """
+    Сбрасывает все закэшированные ответы по рецептам:
+    изменились теги, ингредиенты или авторы.
+    """
+    bump_on_commit(CATALOG_VERSION_KEY)
+
+
+def invalidate_catalog_data(name):
+    """
+    Сбрасывает предсобранный в процессах справочник (теги, ингредиенты).
+    """
+    bump_on_commit(CATALOG_DATA_VERSION_KEY.format(name))
+
+
+def invalidate_recipe(recipe_id):
+    """
+    Сбрасывает списки рецептов и детальную страницу одного рецепта.
+    """
+    bump_on_commit(LIST_VERSION_KEY, RECIPE_VERSION_KEY.format(recipe_id))
+
+
+def normalize_query(query_params):
+    return '&'.join(
+        f'{key}={value}'
+        for key in sorted(query_params)
+        for value in sorted(query_params.getlist(key))
+    )
+
+
+def recipe_cache_key(request, pk=None):
+    if pk is None:
+        version_keys = (CATALOG_VERSION_KEY, LIST_VERSION_KEY)
+    else:
+        version_keys = (CATALOG_VERSION_KEY, RECIPE_VERSION_KEY.format(pk))
+
+    versions = ':'.join(str(v) for v in get_versions(*version_keys))
+    url = request.build_absolute_uri(request.path)
+    query = normalize_query(request.query_params)
+    digest = hashlib.md5(f'{url}?{query}'.encode()).hexdigest()
+    return f'recipes:response:{versions}:{digest}'
+
+
+def cached_anonymous_response(view_method):
+    """
+    Кэширует данные успешных ответов на анонимные GET-запросы.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        if not request.user.is_anonymous:
+            return view_method(self, request, *args, **kwargs)
+
+        key = recipe_cache_key(request, kwargs.get('pk'))
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, settings.RECIPES_CACHE_TIMEOUT)
+        return response
+
+    return wrapper
+
+
+def get_catalog(name, queryset, serializer_class):
+    """
+    Справочник в виде готовых байтов JSON и ETag. Хранится в памяти
+    процесса и пересобирается, когда меняется счетчик версии.
+    """
+    version, = get_versions(CATALOG_DATA_VERSION_KEY.format(name))
+    entry = _catalogs.get(name)
+    if entry is not None and entry[0] == version:
+        return entry[1], entry[2]
+
+    with _catalogs_lock:
+        entry = _catalogs.get(name)
+        if entry is None or entry[0] != version:
+            data = serializer_class(queryset.all(), many=True).data
+            content = JSONRenderer().render(data)
+            etag = '"{}"'.format(hashlib.sha1(content).hexdigest())
+            entry = _catalogs[name] = (version, content, etag)
+
+    return entry[1], entry[2]
+
+
+def etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(',')]
+    return '*' in tags or etag in tags
+
+
+def catalog_response(request, name, queryset, serializer_class):
+    content, etag = get_catalog(name, queryset, serializer_class)
+    if etag_matches(request, etag):
+        response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = HttpResponse(content, content_type='application/json')
+    response['ETag'] = etag
+    return response
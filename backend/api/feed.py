@@ -0,0 +1,171 @@
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+
+from recipes.models import Recipe
+from users.models import FeedEntry, Subscription
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def get_executor():
+    return ThreadPoolExecutor(
+        max_workers=settings.FEED_WORKERS,
+        thread_name_prefix='feed-fanout',
+    )
+
+
+def run_in_worker(func, *args):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception('Не удалось разослать рецепты в ленты')
+    finally:
+        connection.close()
+
+
+def schedule(func, *args):
+    """
+    После фиксации транзакции запускает func в пуле потоков.
+    При FEED_WORKERS = 0 — сразу в текущем потоке.
+    """
+    if settings.FEED_WORKERS:
+        transaction.on_commit(
+            lambda: get_executor().submit(run_in_worker, func, *args)
+        )
+    else:
+        transaction.on_commit(lambda: func(*args))
+
+
+def add_entries(author_id, recipe_ids, user_ids):
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user_id=user_id, recipe_id=recipe_id,
+                      author_id=author_id)
+            for user_id in user_ids
+            for recipe_id in recipe_ids
+        ),
+        batch_size=settings.FEED_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def fan_out_recipes(recipes):
+    """
+    Добавляет новые рецепты в ленты подписчиков их авторов.
+    До FEED_FANOUT_SYNC_LIMIT записей пишется сразу, в той же
+    транзакции; рассылка по большому числу подписчиков уходит в фон.
+    """
+    recipe_ids = defaultdict(list)
+    for recipe in recipes:
+        recipe_ids[recipe.author_id].append(recipe.pk)
+
+    limit = settings.FEED_FANOUT_SYNC_LIMIT
+    for author_id, ids in recipe_ids.items():
+        max_followers = limit // len(ids)
+        follower_ids = list(
+            Subscription.objects.filter(
+                following_id=author_id
+            ).values_list('follower_id', flat=True).distinct()[
+                :max_followers + 1
+            ]
+        )
+        if len(follower_ids) <= max_followers:
+            add_entries(author_id, ids, follower_ids)
+        else:
+            schedule(fan_out_in_batches, author_id, ids)
+
+
+def fan_out_in_batches(author_id, recipe_ids):
+    """
+    Рассылает рецепты подписчикам автора порциями по FEED_BATCH_SIZE,
+    каждая порция — в своей транзакции.
+    """
+    batch_size = max(settings.FEED_BATCH_SIZE // len(recipe_ids), 1)
+    subscriptions = Subscription.objects.filter(following_id=author_id)
+    last_id = 0
+    while True:
+        follower_ids = list(
+            subscriptions.filter(follower_id__gt=last_id).order_by(
+                'follower_id'
+            ).values_list('follower_id', flat=True).distinct()[:batch_size]
+        )
+        if not follower_ids:
+            return
+        try:
+            with transaction.atomic():
+                add_entries(author_id, recipe_ids, follower_ids)
+                # Кто-то мог отписаться, пока читалась эта порция.
+                FeedEntry.objects.filter(
+                    recipe_id__in=recipe_ids, user_id__in=follower_ids
+                ).exclude(
+                    user_id__in=subscriptions.filter(
+                        follower_id__in=follower_ids
+                    ).values('follower_id')
+                ).delete()
+        except IntegrityError:
+            # Рецепты удалили до окончания рассылки.
+            return
+        last_id = follower_ids[-1]
+
+
+def backfill_feed(follower_id, author_id):
+    """
+    Добавляет в ленту подписчика все рецепты автора.
+    """
+    recipe_ids = Recipe.objects.filter(author_id=author_id).order_by(
+    ).values_list('pk', flat=True)
+    add_entries(author_id, recipe_ids.iterator(), [follower_id])
+
+
+def trim_feed(follower_id, author_id):
+    """
+    Убирает рецепты автора из ленты, если подписки на него не осталось.
+    """
+    if Subscription.objects.filter(
+        follower_id=follower_id, following_id=author_id
+    ).exists():
+        return
+    FeedEntry.objects.filter(
+        user_id=follower_id, author_id=author_id
+    ).delete()
+
+
+def rebuild_feeds(user_ids=None, batch_size=1000):
+    """
+    Собирает ленты заново по подпискам и рецептам.
+    Возвращает число записанных строк.
+    """
+    subscriptions = Subscription.objects.all()
+    entries = FeedEntry.objects.all()
+    if user_ids is not None:
+        subscriptions = subscriptions.filter(follower_id__in=user_ids)
+        entries = entries.filter(user_id__in=user_ids)
+
+    rows = subscriptions.filter(
+        following__recipes__isnull=False
+    ).values_list(
+        'follower_id', 'following__recipes__id', 'following_id'
+    ).distinct().order_by()
+
+    created = 0
+    with transaction.atomic():
+        entries.delete()
+        batch = []
+        for user_id, recipe_id, author_id in rows.iterator():
+            batch.append(FeedEntry(
+                user_id=user_id, recipe_id=recipe_id, author_id=author_id
+            ))
+            if len(batch) == batch_size:
+                FeedEntry.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        FeedEntry.objects.bulk_create(batch)
+        created += len(batch)
+
+    return created
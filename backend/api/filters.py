@@ -1,8 +1,12 @@
 from django_filters import rest_framework
+from rest_framework.exceptions import ValidationError
 
+from recipes.fulltext import search
 from recipes.models import Recipe
 from users.models import User
 
+from .paginators import CursorOrPageNumberPagination
+
 
 class IngredientFilter(rest_framework.FilterSet):
     name = rest_framework.CharFilter(
@@ -19,6 +23,7 @@ class RecipeFilter(rest_framework.FilterSet):
     tags = rest_framework.AllValuesMultipleFilter(field_name='tags__slug')
     is_in_shopping_cart = rest_framework.BooleanFilter(method='filter_by_cart')
     is_favorited = rest_framework.BooleanFilter(method='filter_by_favorites')
+    search = rest_framework.CharFilter(method='filter_by_search')
 
     class Meta:
         fields = ('tags', 'author', 'is_in_shopping_cart', 'is_favorited',)
@@ -33,3 +38,17 @@ class RecipeFilter(rest_framework.FilterSet):
         if value and self.request.user.is_authenticated:
             return queryset.filter(favorite_recipes=self.request.user)
         return queryset
+
+    def filter_by_search(self, queryset, name, value):
+        """
+        Результаты поиска упорядочены по релевантности, а курсор
+        пагинации — по id, поэтому вместе их не используем.
+        """
+        value = value.strip()
+        if not value:
+            return queryset
+        if CursorOrPageNumberPagination().is_cursor_mode(self.request):
+            raise ValidationError(
+                {'search': 'Поиск не поддерживает курсорную пагинацию'}
+            )
+        return search(queryset, value)
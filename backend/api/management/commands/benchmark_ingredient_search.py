@@ -0,0 +1,85 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.filters import IngredientFilter
+from api.search import IngredientIndex, fold, get_ingredient_index
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает задержку поиска ингредиентов через индекс '
+            'и через фильтр icontains')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--limit', type=int, default=50)
+        parser.add_argument(
+            '--scale', type=int, default=0,
+            help='Дополнительно замерить нечеткий поиск на синтетическом '
+                 'справочнике из указанного числа строк'
+        )
+
+    def handle(self, *args, **options):
+        names = list(Ingredient.objects.values_list('name', flat=True))
+        if not names:
+            self.stderr.write('Справочник ингредиентов пуст')
+            return
+
+        queries = sorted({
+            fold(name)[:length]
+            for name in names[::max(len(names) // 50, 1)]
+            for length in (1, 2, 4)
+        })
+        index = get_ingredient_index()
+
+        def run_filter(query):
+            queryset = IngredientFilter(
+                {'name': query}, queryset=Ingredient.objects.all()
+            ).qs
+            return list(queryset.values('id', 'name', 'measurement_unit'))
+
+        def run_index(query):
+            return index.search(query, options['limit'])
+
+        def run_fuzzy(query):
+            return index.fuzzy_search(query, options['limit'])
+
+        typos = [misspell(fold(name)) for name in names[::50]]
+        index.fuzzy_search('прогрев', 1)
+
+        self.stdout.write(
+            f'Ингредиентов: {len(names)}, запросов: {len(queries)}'
+        )
+        self.measure('icontains', run_filter, queries, options['repeat'])
+        self.measure('index', run_index, queries, options['repeat'])
+        self.measure('fuzzy', run_fuzzy, typos, options['repeat'])
+
+        if options['scale']:
+            rows = [
+                (pk, f'{names[pk % len(names)]} {pk}', 'г')
+                for pk in range(options['scale'])
+            ]
+            index = IngredientIndex(rows)
+            index.fuzzy_search('прогрев', 1)
+            self.stdout.write(f'Синтетический справочник: {len(rows)}')
+            self.measure('fuzzy', run_fuzzy, typos, options['repeat'])
+
+    def measure(self, title, search, queries, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for query in queries:
+                search(query)
+        elapsed = time.perf_counter() - started
+        per_query = elapsed / (repeat * len(queries)) * 1e6
+        self.stdout.write(f'{title}: {per_query:.1f} мкс на запрос')
+
+
+def misspell(name):
+    """
+    Заменяет одну букву в первом слове названия.
+    """
+    word = name.split()[0]
+    position = len(word) // 2
+    replacement = 'а' if word[position] != 'а' else 'о'
+    return word[:position] + replacement + word[position + 1:]
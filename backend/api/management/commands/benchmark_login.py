@@ -0,0 +1,94 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIRequestFactory
+
+from api.views import CustomAuthToken
+from users.models import User
+
+USERNAME_PREFIX = 'bench_login_'
+PASSWORD = 'bench-login-password'
+FAST_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+
+class Command(BaseCommand):
+    help = ('Замеряет пропускную способность входа по токену '
+            'при параллельных запросах')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=400)
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument(
+            '--fast-hasher', action='store_true',
+            help='Хэшировать пароли MD5, чтобы замерить только работу с БД'
+        )
+
+    def handle(self, *args, **options):
+        hashers = FAST_HASHERS if options['fast_hasher'] else None
+        with override_settings(**({'PASSWORD_HASHERS': hashers}
+                                  if hashers else {})):
+            emails = self.create_users(options['users'])
+            try:
+                self.run(emails, options)
+            finally:
+                User.objects.filter(
+                    username__startswith=USERNAME_PREFIX
+                ).delete()
+
+    def create_users(self, count):
+        User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+        password = make_password(PASSWORD)
+        users = User.objects.bulk_create(
+            User(
+                username=f'{USERNAME_PREFIX}{i}',
+                email=f'{USERNAME_PREFIX}{i}@example.com',
+                password=password,
+            )
+            for i in range(count)
+        )
+        return [user.email for user in users]
+
+    def run(self, emails, options):
+        view = CustomAuthToken.as_view()
+        factory = APIRequestFactory()
+
+        def login(email):
+            request = factory.post(
+                '/api/auth/token/login/',
+                {'email': email, 'password': PASSWORD},
+                format='json',
+            )
+            started = time.perf_counter()
+            response = view(request)
+            if response.status_code != 200:
+                raise RuntimeError(f'{email}: {response.status_code}')
+            return time.perf_counter() - started
+
+        for title in ('создание токена', 'токен уже есть'):
+            with CaptureQueriesContext(connection) as queries:
+                login(emails[0])
+            self.stdout.write(
+                f'Запросов к БД на вход ({title}): {len(queries)}'
+            )
+
+        requests = [
+            emails[i % len(emails)] for i in range(options['requests'])
+        ]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            latencies = sorted(pool.map(login, requests))
+        elapsed = time.perf_counter() - started
+
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        self.stdout.write(
+            f'Потоков: {options["workers"]}, входов: {len(latencies)}, '
+            f'{len(latencies) / elapsed:.0f} входов/с, '
+            f'среднее {statistics.mean(latencies) * 1000:.1f} мс, '
+            f'p95 {p95 * 1000:.1f} мс'
+        )
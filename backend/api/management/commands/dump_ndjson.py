@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from api.ndjson import dump_objects
+
+
+class Command(BaseCommand):
+    help = ('Потоково выгружает пользователей, справочники, рецепты, '
+            'избранное, корзины и подписки в NDJSON')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        with open(options['path'], 'w', encoding='utf-8') as file:
+            counts = dump_objects(file, options['batch_size'])
+        for label, count in counts.items():
+            self.stdout.write(f'{label}: {count}')
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.base import DeserializationError
+from django.db import IntegrityError, transaction
+
+from api.cache import invalidate_catalog, invalidate_catalog_data
+from api.ndjson import load_objects
+
+
+class Command(BaseCommand):
+    help = ('Потоково загружает NDJSON, выгруженный dump_ndjson, '
+            'пачками bulk_create в одной транзакции')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            with open(options['path'], encoding='utf-8') as file:
+                with transaction.atomic():
+                    counts = load_objects(file, options['batch_size'])
+                    invalidate_catalog()
+                    invalidate_catalog_data('tag')
+                    invalidate_catalog_data('ingredient')
+        except (DeserializationError, IntegrityError) as error:
+            raise CommandError(f'Загрузка прервана: {error}')
+
+        elapsed = time.perf_counter() - started
+        for label, count in counts.items():
+            self.stdout.write(f'{label}: {count}')
+        self.stdout.write(f'Готово за {elapsed:.1f} с')
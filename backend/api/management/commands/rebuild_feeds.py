@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api.feed import rebuild_feeds
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок по подпискам и рецептам'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help='id пользователя; можно указать несколько раз'
+        )
+
+    def handle(self, *args, **options):
+        created = rebuild_feeds(options['user_ids'])
+        self.stdout.write(f'Записано строк: {created}')
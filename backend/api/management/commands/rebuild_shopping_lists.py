@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from api.shopping_cart import rebuild_cart_totals
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает суммы ингредиентов в списках покупок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help='id пользователя; можно указать несколько раз'
+        )
+
+    def handle(self, *args, **options):
+        created = rebuild_cart_totals(options['user_ids'])
+        self.stdout.write(f'Записано строк: {created}')
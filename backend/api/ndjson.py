@@ -0,0 +1,132 @@
+from collections import Counter
+
+from django.core import serializers
+from django.core.management.color import no_style
+from django.core.serializers.base import DeserializationError
+from django.db import connection
+
+from recipes.models import (Ingredient, Recipe, RecipeIngredient, RecipeTag,
+                            RecipeUserFavorites, Tag)
+from users.models import (FeedEntry, ShoppingCart, ShoppingCartIngredient,
+                          Subscription, User)
+
+# Порядок важен: каждая модель ссылается только на предыдущие.
+FIXTURE_MODELS = (
+    User,
+    Tag,
+    Ingredient,
+    Recipe,
+    RecipeTag,
+    RecipeIngredient,
+    RecipeUserFavorites,
+    ShoppingCart,
+    ShoppingCartIngredient,
+    Subscription,
+    FeedEntry,
+)
+FORMAT = 'jsonl'
+
+
+def auto_m2m_fields(model):
+    """
+    Связи многие-ко-многим без явной промежуточной модели
+    (у пользователя — группы и права). Остальные выгружаются
+    отдельными моделями.
+    """
+    return [
+        field for field in model._meta.many_to_many
+        if field.remote_field.through._meta.auto_created
+    ]
+
+
+def iter_chunks(model, batch_size):
+    """
+    Объекты модели порциями по первичному ключу, без OFFSET
+    и с одним запросом на порцию для связей многие-ко-многим.
+    """
+    queryset = model.objects.order_by('pk').prefetch_related(
+        *(field.name for field in auto_m2m_fields(model))
+    )
+    last_pk = None
+    while True:
+        chunk = queryset
+        if last_pk is not None:
+            chunk = chunk.filter(pk__gt=last_pk)
+        chunk = list(chunk[:batch_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1].pk
+
+
+def dump_objects(stream, batch_size):
+    """
+    Пишет объекты всех моделей в stream по одному JSON на строку.
+    """
+    serializer = serializers.get_serializer(FORMAT)()
+    counts = Counter()
+    for model in FIXTURE_MODELS:
+        for chunk in iter_chunks(model, batch_size):
+            serializer.serialize(chunk, stream=stream)
+            counts[model._meta.label] += len(chunk)
+    return counts
+
+
+def save_batch(model, batch):
+    model.objects.bulk_create([item.object for item in batch])
+    for field in auto_m2m_fields(model):
+        through = field.remote_field.through
+        source = field.m2m_field_name() + '_id'
+        target = field.m2m_reverse_field_name() + '_id'
+        through.objects.bulk_create(
+            through(**{source: item.object.pk, target: related_pk})
+            for item in batch
+            for related_pk in (item.m2m_data or {}).get(field.name, ())
+        )
+
+
+def load_objects(lines, batch_size):
+    """
+    Загружает объекты из строк NDJSON пачками bulk_create.
+    Строки должны идти в порядке FIXTURE_MODELS, как их пишет
+    dump_objects. Вызывать внутри транзакции.
+    """
+    allowed = set(FIXTURE_MODELS)
+    counts = Counter()
+    model, batch = None, []
+    for item in serializers.deserialize(FORMAT, lines):
+        item_model = type(item.object)
+        if item_model not in allowed:
+            raise DeserializationError(
+                f'Модель {item_model._meta.label} не поддерживается'
+            )
+        if item_model is not model or len(batch) >= batch_size:
+            if batch:
+                save_batch(model, batch)
+                counts[model._meta.label] += len(batch)
+            model, batch = item_model, []
+        batch.append(item)
+
+    if batch:
+        save_batch(model, batch)
+        counts[model._meta.label] += len(batch)
+
+    reset_sequences(
+        model for model in FIXTURE_MODELS if model._meta.label in counts
+    )
+    return counts
+
+
+def reset_sequences(models):
+    """
+    После вставки с явными pk сдвигает счетчики автоинкремента.
+    """
+    models = list(models)
+    for model in list(models):
+        models.extend(
+            field.remote_field.through for field in auto_m2m_fields(model)
+        )
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
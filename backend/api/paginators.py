@@ -1,5 +1,54 @@
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 
 class CustomPageNumberPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+
+
+class CustomCursorPagination(CursorPagination):
+    """
+    Keyset-пагинация по -pk: без COUNT(*) и OFFSET.
+    """
+    page_size_query_param = 'limit'
+    ordering = '-pk'
+
+
+class FeedCursorPagination(CustomCursorPagination):
+    """
+    Keyset-пагинация ленты: записи упорядочены по id рецепта.
+    """
+    ordering = '-recipe_id'
+
+
+class CursorOrPageNumberPagination(CustomPageNumberPagination):
+    """
+    Постраничная пагинация, по запросу переключаемая на курсорную:
+    ?pagination=cursor для первой страницы, далее ссылки next/previous.
+    """
+    mode_query_param = 'pagination'
+    cursor_mode = 'cursor'
+
+    def __init__(self):
+        self.cursor_paginator = None
+
+    def is_cursor_mode(self, request):
+        params = request.query_params
+        return (
+            params.get(self.mode_query_param) == self.cursor_mode
+            or CustomCursorPagination.cursor_query_param in params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.is_cursor_mode(request):
+            self.cursor_paginator = CustomCursorPagination()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+
+        self.cursor_paginator = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,120 @@
+import io
+import json
+
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
+from rest_framework.parsers import JSONParser, MultiPartParser
+
+LIST_FIELDS = ('tags', 'ingredients')
+
+
+class ImageTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Слишком большое изображение'
+    default_code = 'image_too_large'
+
+
+class RequestTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Слишком большой запрос'
+    default_code = 'request_too_large'
+
+
+def check_image_size(size):
+    limit = settings.RECIPE_IMAGE_MAX_SIZE
+    if size > limit:
+        raise ImageTooLarge(
+            f'Изображение больше {filesizeformat(limit)}'
+        )
+
+
+class RecipeImageUploadHandler(TemporaryFileUploadHandler):
+    """
+    Пишет загружаемый файл сразу во временный файл на диске и прерывает
+    загрузку, как только он превысил RECIPE_IMAGE_MAX_SIZE.
+    """
+    def handle_raw_input(self, input_data, meta, content_length, boundary,
+                         encoding=None):
+        fields_limit = settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+        if fields_limit is not None:
+            check_image_size(content_length - fields_limit)
+
+    def receive_data_chunk(self, raw_data, start):
+        check_image_size(start + len(raw_data))
+        return super().receive_data_chunk(raw_data, start)
+
+
+def check_import_size(size):
+    limit = settings.RECIPE_IMPORT_MAX_BODY_SIZE
+    if size > limit:
+        raise RequestTooLarge(
+            f'Запрос больше {filesizeformat(limit)}: '
+            'разделите рецепты на несколько запросов'
+        )
+
+
+class RecipeImportParser(JSONParser):
+    """
+    JSON пакетной загрузки рецептов: тело не больше
+    RECIPE_IMPORT_MAX_BODY_SIZE, даже без заголовка Content-Length.
+    """
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = (parser_context or {}).get('request')
+        if request is not None:
+            check_import_size(int(request.META.get('CONTENT_LENGTH') or 0))
+        content = stream.read(settings.RECIPE_IMPORT_MAX_BODY_SIZE + 1)
+        check_import_size(len(content))
+        return super().parse(io.BytesIO(content), media_type, parser_context)
+
+
+def parse_list(values):
+    """
+    Списки в форме: повторяющееся поле (tags=1&tags=2)
+    или одно поле со списком в JSON; элементы-объекты — тоже в JSON.
+    """
+    if len(values) == 1 and values[0].lstrip().startswith('['):
+        return json.loads(values[0])
+    return [
+        json.loads(value) if value.lstrip().startswith('{') else value
+        for value in values
+    ]
+
+
+class RecipeMultiPartParser(MultiPartParser):
+    """
+    multipart/form-data для рецептов: изображение передается файлом,
+    tags и ingredients приводятся к спискам, как в JSON.
+    """
+    def parse(self, stream, media_type=None, parser_context=None):
+        django_request = parser_context['request']._request
+        django_request.upload_handlers = [
+            RecipeImageUploadHandler(django_request)
+        ]
+        try:
+            data_and_files = super().parse(
+                stream, media_type, parser_context
+            )
+        except ImageTooLarge:
+            # Как при ошибке разбора в самом Django: повторное обращение
+            # к request.POST не должно снова читать тело запроса.
+            django_request._mark_post_parse_error()
+            raise
+
+        form = data_and_files.data
+        data = {key: form[key] for key in form if key not in LIST_FIELDS}
+        try:
+            for key in LIST_FIELDS:
+                if key in form:
+                    data[key] = parse_list(form.getlist(key))
+        except json.JSONDecodeError as error:
+            raise ParseError(f'Некорректный JSON в поле формы: {error}')
+
+        # Словарь вместо MultiValueDict: иначе при слиянии данных
+        # с файлами в request.data попадут списки файлов.
+        files = data_and_files.files
+        data_and_files.data = data
+        data_and_files.files = {key: files[key] for key in files}
+        return data_and_files
@@ -0,0 +1,149 @@
+from django.conf import settings
+from django.db import transaction
+
+from recipes.models import (Ingredient, Recipe, RecipeIngredient, RecipeTag,
+                            Tag)
+from recipes.renditions import schedule_renditions
+
+from .cache import invalidate_catalog
+from .feed import fan_out_recipes
+from .serializers import RecipeSerializer
+
+
+def collect_ids(values):
+    ids = set()
+    for value in values:
+        if isinstance(value, int):
+            ids.add(value)
+        elif isinstance(value, str) and value.isnumeric():
+            ids.add(int(value))
+    return ids
+
+
+def collect_reference_ids(items):
+    """
+    id всех тегов и ингредиентов, упомянутых в пакете рецептов.
+    """
+    tag_ids, ingredient_ids = [], []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        tags = item.get('tags')
+        if isinstance(tags, list):
+            tag_ids.extend(tags)
+        ingredients = item.get('ingredients')
+        if isinstance(ingredients, list):
+            ingredient_ids.extend(
+                ingredient.get('id') for ingredient in ingredients
+                if isinstance(ingredient, dict)
+            )
+    return collect_ids(tag_ids), collect_ids(ingredient_ids)
+
+
+def validate_items(items, author, context):
+    """
+    Проверяет рецепты пакета. Возвращает список результатов
+    (ошибки для невалидных рецептов) и пары (индекс, validated_data).
+    """
+    tag_ids, ingredient_ids = collect_reference_ids(items)
+    context = dict(
+        context,
+        tags_by_id=Tag.objects.in_bulk(tag_ids),
+        ingredients_by_id=Ingredient.objects.in_bulk(ingredient_ids),
+    )
+    names = {item.get('name') for item in items if isinstance(item, dict)}
+    taken_names = set(
+        Recipe.objects.filter(
+            author=author, name__in=[name for name in names if name]
+        ).values_list('name', flat=True)
+    )
+
+    results = [None] * len(items)
+    valid = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[index] = {'index': index,
+                              'errors': 'Неверный формат рецепта'}
+            continue
+
+        serializer = RecipeSerializer(data=item, context=context)
+        if not serializer.is_valid():
+            results[index] = {'index': index, 'errors': serializer.errors}
+            continue
+
+        name = serializer.validated_data['name']
+        if name in taken_names:
+            results[index] = {
+                'index': index,
+                'errors': 'Рецепт с таким названием уже существует'
+            }
+            continue
+
+        taken_names.add(name)
+        valid.append((index, serializer.validated_data))
+
+    return results, valid
+
+
+@transaction.atomic
+def create_recipes(author, valid):
+    batch_size = settings.RECIPE_IMPORT_BATCH_SIZE
+    recipes = []
+    for _, data in valid:
+        fields = {
+            key: value for key, value in data.items()
+            if key not in ('tags', 'ingredients')
+        }
+        recipes.append(Recipe(author=author, **fields))
+    Recipe.objects.bulk_create(recipes, batch_size=batch_size)
+
+    if any(recipe.pk is None for recipe in recipes):
+        # Не все СУБД возвращают id из bulk_create; названия рецептов
+        # автора уникальны, поэтому id можно найти по ним.
+        ids = dict(
+            Recipe.objects.filter(
+                author=author, name__in=[recipe.name for recipe in recipes]
+            ).values_list('name', 'pk')
+        )
+        for recipe in recipes:
+            recipe.pk = ids[recipe.name]
+
+    RecipeTag.objects.bulk_create(
+        (
+            RecipeTag(recipe=recipe, tag=tag)
+            for recipe, (_, data) in zip(recipes, valid)
+            for tag in data['tags']
+        ),
+        batch_size=batch_size,
+    )
+    RecipeIngredient.objects.bulk_create(
+        (
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient=ingredient['ingredient'],
+                amount=ingredient['amount'],
+            )
+            for recipe, (_, data) in zip(recipes, valid)
+            for ingredient in data['ingredients']
+        ),
+        batch_size=batch_size,
+    )
+    # bulk_create не шлет post_save: копии изображений и ленты
+    # подписчиков обновляем сами.
+    for recipe in recipes:
+        schedule_renditions(recipe.pk, recipe.image.name)
+    fan_out_recipes(recipes)
+    invalidate_catalog()
+    return recipes
+
+
+def import_recipes(items, author, context):
+    """
+    Пакетная загрузка рецептов в формате RecipeSerializer.
+    Возвращает результат для каждого рецепта и число созданных.
+    """
+    results, valid = validate_items(items, author, context)
+    recipes = create_recipes(author, valid) if valid else []
+    for (index, _), recipe in zip(valid, recipes):
+        results[index] = {'index': index, 'id': recipe.pk}
+    return results, len(recipes)
@@ -0,0 +1,22 @@
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+class PlainTextRenderer(BaseRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, str):
+            return data.encode(self.charset)
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+
+class CSVRenderer(PlainTextRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+SHOPPING_CART_RENDERERS = (PlainTextRenderer, CSVRenderer, JSONRenderer)
@@ -0,0 +1,251 @@
+import threading
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+from django.conf import settings
+
+from recipes.models import Ingredient
+
+from .cache import CATALOG_DATA_VERSION_KEY, get_versions
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def fold(text):
+    """
+    Приводит строку к виду для поиска: без учета регистра и ё/е.
+    """
+    return text.casefold().replace('ё', 'е')
+
+
+def trigrams(text, pad_end=True):
+    padded = ' ' + text + (' ' if pad_end else '')
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def prefix_distance(query, word, max_distance):
+    """
+    Наименьшее число правок, переводящих query в начало слова word
+    (или в слово целиком), если оно не больше max_distance, иначе None.
+    Считаются только клетки в полосе шириной max_distance
+    вокруг диагонали.
+    """
+    query_length, word_length = len(query), len(word)
+    if word_length < query_length - max_distance:
+        return None
+
+    over = max_distance + 1
+    previous = [j if j <= max_distance else over
+                for j in range(word_length + 1)]
+    for i in range(1, query_length + 1):
+        current = [over] * (word_length + 1)
+        if i <= max_distance:
+            current[0] = i
+        row_min = current[0]
+        char = query[i - 1]
+        for j in range(max(1, i - max_distance),
+                       min(word_length, i + max_distance) + 1):
+            value = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char != word[j - 1]),
+            )
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return None
+        previous = current
+
+    distance = min(previous[max(0, query_length - max_distance):
+                            query_length + max_distance + 1])
+    return distance if distance <= max_distance else None
+
+
+class IngredientIndex:
+    """
+    Индекс для автодополнения по названию ингредиента.
+    Сначала идут совпадения с начала названия, затем с начала
+    одного из слов, затем остальные вхождения подстроки.
+    """
+
+    def __init__(self, rows):
+        self.entries = sorted(
+            (
+                (fold(name), {'id': pk, 'name': name,
+                              'measurement_unit': unit})
+                for pk, name, unit in rows
+            ),
+            key=lambda entry: (entry[0], entry[1]['id'])
+        )
+        self.keys = [key for key, _ in self.entries]
+        self._words = None
+        self._words_lock = threading.Lock()
+
+    @property
+    def words(self):
+        """
+        Словарь слов из названий и триграммный индекс по нему.
+        Строится при первом нечетком запросе.
+        """
+        if self._words is None:
+            with self._words_lock:
+                if self._words is None:
+                    self._words = self.build_words()
+        return self._words
+
+    def build_words(self):
+        positions = defaultdict(list)
+        for position, key in enumerate(self.keys):
+            for word in set(key.split()):
+                positions[word].append(position)
+
+        vocabulary = list(positions)
+        postings = defaultdict(list)
+        for word_id, word in enumerate(vocabulary):
+            for trigram in trigrams(word):
+                postings[trigram].append(word_id)
+
+        return vocabulary, dict(positions), dict(postings)
+
+    def search(self, query, limit):
+        query = fold(query).strip()
+        if not query:
+            return [item for _, item in self.entries[:limit]]
+
+        results = self.prefix_search(query, limit)
+        if len(results) == limit:
+            return results
+
+        word_matches = []
+        infix_matches = []
+        word_query = ' ' + query
+        for key, item in self.entries:
+            if key.startswith(query):
+                continue
+            if word_query in key:
+                word_matches.append(item)
+                if len(results) + len(word_matches) == limit:
+                    break
+            elif query in key:
+                infix_matches.append(item)
+
+        results.extend(word_matches)
+        results.extend(infix_matches)
+        return results[:limit]
+
+    def prefix_search(self, query, limit):
+        results = []
+        position = bisect_left(self.keys, query)
+        while (
+            position < len(self.keys)
+            and len(results) < limit
+            and self.keys[position].startswith(query)
+        ):
+            results.append(self.entries[position][1])
+            position += 1
+        return results
+
+    def fuzzy_search(self, query, limit):
+        """
+        Поиск с опечатками. Сначала идут совпадения с начала названия,
+        затем названия, в которых для каждого слова запроса есть близкое
+        слово (или начало слова): по числу правок, затем по длине.
+        """
+        query = fold(query).strip()
+        if not query:
+            return self.search(query, limit)
+
+        results = self.prefix_search(query, limit)
+        if len(results) == limit:
+            return results
+
+        scores = None
+        for query_word in query.split():
+            word_scores = self.match_word(query_word)
+            if scores is None:
+                scores = word_scores
+            else:
+                scores = {
+                    position: scores[position] + distance
+                    for position, distance in word_scores.items()
+                    if position in scores
+                }
+            if not scores:
+                return results
+
+        seen = {item['id'] for item in results}
+        ranked = sorted(
+            (distance, len(self.keys[position]), position)
+            for position, distance in scores.items()
+            if self.entries[position][1]['id'] not in seen
+        )
+        results.extend(
+            self.entries[position][1]
+            for _, _, position in ranked[:limit - len(results)]
+        )
+        return results
+
+    def match_word(self, query_word):
+        """
+        Позиции названий со словом, близким к query_word,
+        и наименьшее число правок для каждой из них.
+        """
+        vocabulary, positions, postings = self.words
+        max_distance = 0 if len(query_word) < 4 else (
+            1 if len(query_word) < 8 else 2
+        )
+
+        # Запрос может быть недописанным словом, поэтому конец
+        # слова в его триграммах не отмечается. Каждая правка портит
+        # не больше трех триграмм, так что у подходящего слова
+        # остается не меньше threshold общих триграмм.
+        query_trigrams = trigrams(query_word, pad_end=False)
+        threshold = max(1, len(query_trigrams) - 3 * max_distance)
+        counts = Counter()
+        for trigram in query_trigrams:
+            counts.update(postings.get(trigram, ()))
+
+        scores = {}
+        for word_id, count in counts.items():
+            if count < threshold:
+                continue
+            word = vocabulary[word_id]
+            distance = prefix_distance(query_word, word, max_distance)
+            if distance is None:
+                continue
+            for position in positions[word]:
+                if distance < scores.get(position, max_distance + 1):
+                    scores[position] = distance
+        return scores
+
+
+def get_ingredient_index():
+    """
+    Индекс текущего процесса; пересобирается при изменении ингредиентов.
+    """
+    global _index
+
+    version, = get_versions(CATALOG_DATA_VERSION_KEY.format('ingredient'))
+    index = _index
+    if index is not None and index[0] == version:
+        return index[1]
+
+    with _index_lock:
+        if _index is None or _index[0] != version:
+            rows = Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            )
+            _index = (version, IngredientIndex(rows))
+
+    return _index[1]
+
+
+def search_ingredients(query, limit=None, fuzzy=False):
+    if limit is None:
+        limit = settings.INGREDIENT_SEARCH_LIMIT
+    index = get_ingredient_index()
+    if fuzzy:
+        return index.fuzzy_search(query, limit)
+    return index.search(query, limit)
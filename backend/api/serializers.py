@@ -1,23 +1,31 @@
 import base64
 
+from django.conf import settings
 from django.contrib.auth import password_validation
 from django.contrib.auth.hashers import make_password
 from django.core.files.base import ContentFile
-from django.db.models import F
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Prefetch
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
 from foodgram.settings import MAX_INGREDIENT_AMOUNT, MIN_INGREDIENT_AMOUNT
-from recipes.models import (Ingredient, Recipe, RecipeIngredient,
+from recipes.models import (Ingredient, Recipe, RecipeIngredient, RecipeTag,
                             RecipeUserFavorites, Tag)
+from recipes.renditions import needs_renditions
 from users.models import ShoppingCart, Subscription, User
 
+from .parsers import check_image_size
+from .shopping_cart import update_recipe_in_carts
+
 
 class Base64ImageField(serializers.ImageField):
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
             format, imgstr = data.split(';base64,')
             ext = format.split('/')[-1]
+            check_image_size(len(imgstr) * 3 // 4)
             data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
 
         return super().to_internal_value(data)
@@ -58,11 +66,7 @@ class UserSerializer(serializers.ModelSerializer):
         return super(UserSerializer, self).create(validated_data)
 
     def get_subs(self, obj):
-        user = getattr(self.context.get('request'), 'user', None)
-        return Subscription.objects.filter(
-            follower=getattr(user, 'id', None),
-            following=getattr(obj, 'id', None)
-        ).exists()
+        return getattr(obj, 'id', None) in get_subscribed_ids(self.context)
 
 
 class RecipeSerializer(serializers.ModelSerializer):
@@ -72,6 +76,9 @@ class RecipeSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField('get_favorites')
     is_in_shopping_cart = serializers.SerializerMethodField('get_cart')
     image = Base64ImageField()
+    image_renditions = serializers.SerializerMethodField(
+        'get_image_renditions'
+    )
 
     class Meta:
         fields = ('id',
@@ -82,6 +89,7 @@ class RecipeSerializer(serializers.ModelSerializer):
                   'is_in_shopping_cart',
                   'name',
                   'image',
+                  'image_renditions',
                   'text',
                   'cooking_time',
                   )
@@ -90,44 +98,97 @@ class RecipeSerializer(serializers.ModelSerializer):
     @staticmethod
     def setup_eager_loading(queryset):
         queryset = queryset.select_related('author')
-        return queryset.prefetch_related('tags', 'ingredients')
+        return queryset.prefetch_related(
+            'tags',
+            Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient'
+                ).order_by('ingredient__name')
+            ),
+        )
 
     def get_ingredients(self, obj):
-        return obj.ingredients.values(
-            'id',
-            'name',
-            'measurement_unit',
-            amount=F('recipeingredient__amount')
-        )
+        recipe_ingredients = obj.recipe_ingredients.all()
+        if 'recipe_ingredients' not in getattr(
+            obj, '_prefetched_objects_cache', {}
+        ):
+            recipe_ingredients = recipe_ingredients.select_related(
+                'ingredient'
+            ).order_by('ingredient__name')
+
+        return [
+            {
+                'id': recipe_ingredient.ingredient.id,
+                'name': recipe_ingredient.ingredient.name,
+                'measurement_unit': (
+                    recipe_ingredient.ingredient.measurement_unit
+                ),
+                'amount': recipe_ingredient.amount,
+            }
+            for recipe_ingredient in recipe_ingredients
+        ]
 
     def get_favorites(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         return is_in_database(self.context, RecipeUserFavorites, obj)
 
     def get_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         return is_in_database(self.context, ShoppingCart, obj)
 
+    def get_image_renditions(self, obj):
+        """
+        Ссылки на уменьшенные копии; пока они не готовы — пустой словарь.
+        """
+        if needs_renditions(obj):
+            return {}
+        request = self.context.get('request')
+        urls = {}
+        for name, path in obj.image_renditions.items():
+            if name not in settings.RECIPE_IMAGE_RENDITIONS:
+                continue
+            url = default_storage.url(path)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            urls[name] = url
+        return urls
+
     def get_tags_and_ingredients(self):
+        """
+        Теги и ингредиенты из initial_data. При пакетной загрузке
+        справочники передаются в контексте (tags_by_id, ingredients_by_id),
+        чтобы не запрашивать их для каждого рецепта.
+        """
         tag_id_list = parse_to_int(
             set(self.initial_data.get('tags', []))
         )
-        tags_queryset = Tag.objects.filter(pk__in=tag_id_list)
+        tags_by_id = self.context.get('tags_by_id')
+        if tags_by_id is None:
+            tags_by_id = Tag.objects.in_bulk(tag_id_list)
 
         ing_data = self.initial_data.get('ingredients', [])
         unique_ingredients = parse_to_int({
             el.get('id'): el.get('amount', 1) for el in ing_data
         })
 
-        ingredients_queryset = Ingredient.objects.filter(
-            pk__in=unique_ingredients.keys()
-        )
+        ingredients_by_id = self.context.get('ingredients_by_id')
+        if ingredients_by_id is None:
+            ingredients_by_id = Ingredient.objects.in_bulk(
+                unique_ingredients.keys()
+            )
         ingredients = []
-        for ingredient in ingredients_queryset:
-            ingredients.append({
-                'ingredient': ingredient,
-                'amount': unique_ingredients[ingredient.id]
-            })
+        for ingredient_id, amount in unique_ingredients.items():
+            if ingredient_id in ingredients_by_id:
+                ingredients.append({
+                    'ingredient': ingredients_by_id[ingredient_id],
+                    'amount': amount
+                })
 
-        return [tag for tag in tags_queryset], ingredients
+        tags = [tags_by_id[pk] for pk in tag_id_list if pk in tags_by_id]
+        return tags, ingredients
 
     def validate(self, data):
         tags, ingredients = self.get_tags_and_ingredients()
@@ -152,36 +213,101 @@ class RecipeSerializer(serializers.ModelSerializer):
         data['ingredients'] = ingredients
         return super().validate(data)
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
+        tags = validated_data.pop('tags')
 
         if Recipe.objects.filter(author=validated_data['author'],
                                  name=validated_data['name']).exists():
             raise ValidationError('Рецепт с таким названием уже существует')
 
         recipe = super().create(validated_data)
-        for ingredient in ingredients:
-            RecipeIngredient.objects.update_or_create(
+        RecipeTag.objects.bulk_create(
+            RecipeTag(recipe=recipe, tag=tag) for tag in tags
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
                 recipe=recipe,
                 ingredient=ingredient['ingredient'],
                 amount=ingredient['amount']
             )
+            for ingredient in ingredients
+        )
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients = validated_data.pop('ingredients')
-        if ingredients:
-            RecipeIngredient.objects.filter(recipe=instance).delete()
+        tags = validated_data.pop('tags')
 
-        for ingredient in ingredients:
-            RecipeIngredient.objects.create(
-                recipe=instance,
-                ingredient=ingredient['ingredient'],
-                amount=ingredient['amount']
-            )
+        self.update_tags(instance, tags)
+        amounts = self.update_ingredients(instance, ingredients)
+        update_recipe_in_carts(instance, amounts)
 
         return super().update(instance, validated_data)
 
+    @staticmethod
+    def update_tags(instance, tags):
+        current = set(
+            RecipeTag.objects.filter(recipe=instance).values_list(
+                'tag_id', flat=True
+            )
+        )
+        new = {tag.id for tag in tags}
+        if current - new:
+            RecipeTag.objects.filter(
+                recipe=instance, tag_id__in=current - new
+            ).delete()
+        RecipeTag.objects.bulk_create(
+            RecipeTag(recipe=instance, tag_id=tag_id)
+            for tag_id in new - current
+        )
+
+    @staticmethod
+    def update_ingredients(instance, ingredients):
+        """
+        Записывает только изменившиеся ингредиенты рецепта.
+        Возвращает изменения количеств {id ингредиента: разница}
+        для добавленных и измененных строк: bulk-операции не вызывают
+        сигналов, а удаленные строки вычитает сигнал post_delete.
+        """
+        current = {
+            row.ingredient_id: row
+            for row in RecipeIngredient.objects.filter(recipe=instance)
+        }
+        new = {
+            ingredient['ingredient'].id: ingredient['amount']
+            for ingredient in ingredients
+        }
+
+        amounts = {}
+        to_create, to_update = [], []
+        for ingredient_id, amount in new.items():
+            row = current.get(ingredient_id)
+            if row is None:
+                to_create.append(RecipeIngredient(
+                    recipe=instance,
+                    ingredient_id=ingredient_id,
+                    amount=amount
+                ))
+                amounts[ingredient_id] = amount
+            elif row.amount != amount:
+                amounts[ingredient_id] = amount - row.amount
+                row.amount = amount
+                to_update.append(row)
+
+        to_delete = []
+        for ingredient_id, row in current.items():
+            if ingredient_id not in new:
+                to_delete.append(row.pk)
+
+        if to_delete:
+            RecipeIngredient.objects.filter(pk__in=to_delete).delete()
+        RecipeIngredient.objects.bulk_update(to_update, ['amount'])
+        RecipeIngredient.objects.bulk_create(to_create)
+        return amounts
+
 
 class SubscriptionRecipeListSerializer(serializers.ListSerializer):
     def to_representation(self, data):
@@ -195,7 +321,7 @@ class SubscriptionRecipeListSerializer(serializers.ListSerializer):
 
 class RecipeShortInfo(RecipeSerializer):
     class Meta(RecipeSerializer.Meta):
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_renditions', 'cooking_time')
         read_only_fields = ('id', 'name', 'image', 'cooking_time')
         list_serializer_class = SubscriptionRecipeListSerializer
 
@@ -208,9 +334,16 @@ class SubscriptionSerializer(UserSerializer):
         fields = UserSerializer.Meta.fields + ('recipes', 'recipes_count')
 
     def get_recipes_count(self, obj):
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
         return obj.recipes.count()
 
 
+class LoginSerializer(serializers.Serializer):
+    email = serializers.CharField(write_only=True)
+    password = serializers.CharField(write_only=True, trim_whitespace=False)
+
+
 class PasswordChangeSerializer(serializers.Serializer):
     current_password = serializers.CharField(write_only=True, required=True)
     new_password = serializers.CharField(write_only=True, required=True)
@@ -236,7 +369,7 @@ class PasswordChangeSerializer(serializers.Serializer):
         password = self.validated_data['new_password']
         user = self.context['request'].user
         user.set_password(password)
-        user.save()
+        user.save(update_fields=['password'])
         return user
 
 
@@ -248,6 +381,25 @@ def is_in_database(context, model, obj):
     ).exists()
 
 
+def get_subscribed_ids(context):
+    """
+    Множество id авторов, на которых подписан пользователь из запроса.
+    Загружается один раз и хранится в общем контексте сериализаторов.
+    """
+    if 'subscribed_ids' not in context:
+        user = getattr(context.get('request'), 'user', None)
+        if user is None or user.is_anonymous:
+            context['subscribed_ids'] = set()
+        else:
+            context['subscribed_ids'] = set(
+                Subscription.objects.filter(
+                    follower=user
+                ).values_list('following_id', flat=True)
+            )
+
+    return context['subscribed_ids']
+
+
 def parse_to_int(data, whois='id тега'):
     if isinstance(data, int):
         return data
@@ -0,0 +1,160 @@
+import csv
+import json
+
+from django.db import transaction
+from django.db.models import F, Sum
+
+from recipes.models import RecipeIngredient
+from users.models import ShoppingCart, ShoppingCartIngredient
+
+CONTENT_TYPES = {
+    'txt': 'text/plain; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+    'json': 'application/json',
+}
+
+
+class Echo:
+    """
+    Псевдобуфер для csv.writer: возвращает записанную строку.
+    """
+
+    def write(self, value):
+        return value
+
+
+def stream_txt(rows):
+    for row in rows:
+        yield f'{row["name"]} - {row["amount"]} {row["unit"]}\r\n'
+
+
+def stream_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(('name', 'amount', 'measurement_unit'))
+    for row in rows:
+        yield writer.writerow((row['name'], row['amount'], row['unit']))
+
+
+def stream_json(rows):
+    yield '['
+    separator = ''
+    for row in rows:
+        yield separator + json.dumps({
+            'name': row['name'],
+            'amount': row['amount'],
+            'measurement_unit': row['unit'],
+        }, ensure_ascii=False)
+        separator = ','
+    yield ']'
+
+
+STREAMS = {
+    'txt': stream_txt,
+    'csv': stream_csv,
+    'json': stream_json,
+}
+
+
+def stream_shopping_cart(rows, file_format):
+    """
+    Генератор содержимого файла списка покупок в нужном формате.
+    """
+    return STREAMS[file_format](rows)
+
+
+def recipe_amounts(recipe, sign=1):
+    return {
+        ingredient_id: sign * amount
+        for ingredient_id, amount in RecipeIngredient.objects.filter(
+            recipe=recipe
+        ).values_list('ingredient_id', 'amount')
+    }
+
+
+def update_cart_totals(user_ids, amounts):
+    """
+    Добавляет к суммам ингредиентов в списках покупок пользователей
+    изменения amounts ({id ингредиента: изменение количества}).
+    Вызывается внутри транзакции вместе с изменением ShoppingCart.
+    """
+    amounts = {key: value for key, value in amounts.items() if value}
+    if not user_ids or not amounts:
+        return
+
+    existing = {
+        (row.user_id, row.ingredient_id): row
+        for row in ShoppingCartIngredient.objects.select_for_update().filter(
+            user_id__in=user_ids, ingredient_id__in=amounts.keys()
+        )
+    }
+    to_create, to_update, to_delete = [], [], []
+    for user_id in user_ids:
+        for ingredient_id, amount in amounts.items():
+            row = existing.get((user_id, ingredient_id))
+            if row is None:
+                if amount > 0:
+                    to_create.append(ShoppingCartIngredient(
+                        user_id=user_id,
+                        ingredient_id=ingredient_id,
+                        amount=amount,
+                    ))
+                continue
+
+            row.amount += amount
+            if row.amount > 0:
+                to_update.append(row)
+            else:
+                to_delete.append(row.pk)
+
+    ShoppingCartIngredient.objects.bulk_create(to_create)
+    ShoppingCartIngredient.objects.bulk_update(to_update, ['amount'])
+    ShoppingCartIngredient.objects.filter(pk__in=to_delete).delete()
+
+
+def update_recipe_in_carts(recipe, amounts):
+    """
+    Переносит изменение ингредиентов рецепта в списки покупок
+    всех пользователей, у которых он в корзине.
+    """
+    user_ids = set(
+        ShoppingCart.objects.filter(recipe=recipe).values_list(
+            'user_id', flat=True
+        )
+    )
+    update_cart_totals(user_ids, amounts)
+
+
+def rebuild_cart_totals(user_ids=None, batch_size=1000):
+    """
+    Пересчитывает суммы ингредиентов списков покупок с нуля.
+    Возвращает число записанных строк.
+    """
+    carts = ShoppingCart.objects.all()
+    totals = ShoppingCartIngredient.objects.all()
+    if user_ids is not None:
+        carts = carts.filter(user_id__in=user_ids)
+        totals = totals.filter(user_id__in=user_ids)
+
+    rows = carts.filter(
+        recipe__recipe_ingredients__isnull=False
+    ).values(
+        'user_id',
+        ingredient_id=F('recipe__recipe_ingredients__ingredient_id'),
+    ).annotate(
+        amount=Sum('recipe__recipe_ingredients__amount')
+    ).order_by()
+
+    created = 0
+    with transaction.atomic():
+        totals.delete()
+        batch = []
+        for row in rows.iterator():
+            batch.append(ShoppingCartIngredient(**row))
+            if len(batch) == batch_size:
+                ShoppingCartIngredient.objects.bulk_create(batch)
+                created += len(batch)
+                batch = []
+        ShoppingCartIngredient.objects.bulk_create(batch)
+        created += len(batch)
+
+    return created
@@ -0,0 +1,149 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipes.models import (Ingredient, Recipe, RecipeIngredient,
+                            RecipeTag, Tag)
+from users.models import ShoppingCart, Subscription, User
+
+from .authentication import evict_tokens
+from .cache import (invalidate_catalog, invalidate_catalog_data,
+                    invalidate_recipe)
+from .feed import backfill_feed, fan_out_recipes, trim_feed
+from .shopping_cart import recipe_amounts, update_recipe_in_carts
+
+# Поля автора, которые выводятся в ответах по рецептам.
+AUTHOR_FIELDS = frozenset(('username', 'first_name', 'last_name', 'email'))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    invalidate_recipe(instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        fan_out_recipes([instance])
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(sender, instance, **kwargs):
+    """
+    Вычитает рецепт из списков покупок и сразу убирает его из корзин,
+    чтобы каскадное удаление ингредиентов рецепта не вычло их еще раз.
+    """
+    update_recipe_in_carts(instance, recipe_amounts(instance, -1))
+    ShoppingCart.objects.filter(recipe=instance).delete()
+
+
+@receiver(pre_save, sender=RecipeIngredient)
+def recipe_ingredient_saving(sender, instance, raw=False, **kwargs):
+    instance._cart_amounts = {}
+    if raw or instance.pk is None:
+        return
+    previous = RecipeIngredient.objects.filter(pk=instance.pk).values_list(
+        'ingredient_id', 'amount'
+    ).first()
+    if previous is not None:
+        instance._cart_amounts[previous[0]] = -previous[1]
+
+
+@receiver(post_save, sender=RecipeIngredient)
+def recipe_ingredient_saved(sender, instance, raw=False, **kwargs):
+    """
+    Переносит изменение ингредиента рецепта (в том числе из админки)
+    в списки покупок.
+    """
+    if raw:
+        return
+    amounts = getattr(instance, '_cart_amounts', {})
+    amounts[instance.ingredient_id] = (
+        amounts.get(instance.ingredient_id, 0) + instance.amount
+    )
+    update_recipe_in_carts(instance.recipe_id, amounts)
+
+
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_deleted(sender, instance, **kwargs):
+    update_recipe_in_carts(
+        instance.recipe_id, {instance.ingredient_id: -instance.amount}
+    )
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        backfill_feed(instance.follower_id, instance.following_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted(sender, instance, **kwargs):
+    trim_feed(instance.follower_id, instance.following_id)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+@receiver(post_save, sender=RecipeTag)
+@receiver(post_delete, sender=RecipeTag)
+def recipe_relation_changed(sender, instance, **kwargs):
+    invalidate_recipe(instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_m2m_changed(sender, instance, action, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+
+    if isinstance(instance, Recipe):
+        invalidate_recipe(instance.pk)
+    else:
+        invalidate_catalog()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def catalog_changed(sender, instance, **kwargs):
+    invalidate_catalog()
+    invalidate_catalog_data(sender._meta.model_name)
+
+
+@receiver(post_save, sender=User)
+def author_saved(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Автор выводится в ответах по рецептам. У нового пользователя
+    рецептов нет, а пароль и last_login в ответы не попадают.
+    """
+    if created:
+        return
+    if update_fields is not None and not AUTHOR_FIELDS & set(update_fields):
+        return
+    invalidate_catalog()
+
+
+@receiver(post_delete, sender=User)
+def author_deleted(sender, instance, **kwargs):
+    invalidate_catalog()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    """
+    Смена пароля, деактивация и любые другие изменения пользователя
+    сбрасывают его из кэша токенов.
+    """
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    evict_tokens(
+        Token.objects.filter(user_id=instance.pk).values_list('key', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    evict_tokens([instance.key])
@@ -0,0 +1,214 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.models import (Ingredient, Recipe, RecipeIngredient, RecipeTag,
+                            RecipeUserFavorites, Tag)
+from users.models import ShoppingCart, ShoppingCartIngredient, User
+
+from .shopping_cart import rebuild_cart_totals
+
+
+def create_recipes(author, count, tag, ingredient):
+    recipes = [
+        Recipe.objects.create(author=author, name=f'Рецепт {i}',
+                              text='Описание', cooking_time=10,
+                              image='recipe_images/test.jpg')
+        for i in range(count)
+    ]
+    RecipeTag.objects.bulk_create(
+        RecipeTag(recipe=recipe, tag=tag) for recipe in recipes
+    )
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=1)
+        for recipe in recipes
+    )
+    return recipes
+
+
+class RecipeListQueriesTest(TestCase):
+    """
+    Число запросов к списку рецептов не зависит от размера страницы.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@example.com', password='pass'
+        )
+        author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass'
+        )
+        tag = Tag.objects.create(name='Завтрак', slug='breakfast',
+                                 color='#E26C2D')
+        ingredient = Ingredient.objects.create(name='Соль',
+                                               measurement_unit='г')
+        cls.recipes = create_recipes(author, 20, tag, ingredient)
+        RecipeUserFavorites.objects.bulk_create(
+            RecipeUserFavorites(user=cls.user, recipe=recipe)
+            for recipe in cls.recipes[::2]
+        )
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user=cls.user, recipe=recipe)
+            for recipe in cls.recipes[1::2]
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def count_queries(self, limit):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/recipes/', {'limit': limit})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), limit)
+        return len(context.captured_queries), response.data['results']
+
+    def test_queries_do_not_depend_on_page_size(self):
+        small, _ = self.count_queries(10)
+        large, results = self.count_queries(20)
+        self.assertEqual(small, large)
+        self.assertEqual(
+            sum(recipe['is_favorited'] for recipe in results), 10
+        )
+        self.assertEqual(
+            sum(recipe['is_in_shopping_cart'] for recipe in results), 10
+        )
+
+
+class RecipeCacheInvalidationTest(TestCase):
+    """
+    Закэшированный анонимный список рецептов сбрасывается только
+    при изменении данных автора, которые в нем выводятся.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass'
+        )
+        tag = Tag.objects.create(name='Обед', slug='lunch', color='#8775D2')
+        ingredient = Ingredient.objects.create(name='Перец',
+                                               measurement_unit='г')
+        create_recipes(cls.author, 3, tag, ingredient)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.get('/api/recipes/')
+
+    def is_cached(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        return not context.captured_queries
+
+    def test_signup_keeps_cache(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create_user(
+                username='newbie', email='newbie@example.com',
+                password='pass'
+            )
+        self.assertTrue(self.is_cached())
+
+    def test_password_change_keeps_cache(self):
+        client = APIClient()
+        client.force_authenticate(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post('/api/users/set_password/', {
+                'current_password': 'pass',
+                'new_password': 'Kx7-long-enough',
+            })
+        self.assertEqual(response.status_code, 204)
+        self.assertTrue(self.is_cached())
+
+    def test_author_rename_resets_cache(self):
+        self.author.first_name = 'Иван'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.save(update_fields=['first_name'])
+        self.assertFalse(self.is_cached())
+
+
+class ShoppingCartTotalsTest(TestCase):
+    """
+    Суммы ингредиентов в списках покупок следуют за изменениями
+    рецептов, сделанными не только через API.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='buyer', email='buyer@example.com', password='pass'
+        )
+        author = User.objects.create_user(
+            username='author', email='author@example.com', password='pass'
+        )
+        cls.tag = Tag.objects.create(name='Ужин', slug='dinner',
+                                     color='#4A61DD')
+        cls.salt, cls.flour = (
+            Ingredient.objects.create(name='Соль', measurement_unit='г'),
+            Ingredient.objects.create(name='Мука', measurement_unit='г'),
+        )
+        cls.recipes = create_recipes(author, 2, cls.tag, cls.salt)
+        RecipeIngredient.objects.create(recipe=cls.recipes[0],
+                                        ingredient=cls.flour, amount=200)
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user=cls.user, recipe=recipe)
+            for recipe in cls.recipes
+        )
+        rebuild_cart_totals()
+
+    def totals(self):
+        return dict(ShoppingCartIngredient.objects.filter(
+            user=self.user
+        ).values_list('ingredient_id', 'amount'))
+
+    def assert_totals(self, expected):
+        self.assertEqual(self.totals(), expected)
+        rebuild_cart_totals()
+        self.assertEqual(self.totals(), expected)
+
+    def test_recipe_deleted_outside_api(self):
+        self.recipes[0].delete()
+        self.assert_totals({self.salt.id: 1})
+
+    def test_ingredients_edited_outside_api(self):
+        row = RecipeIngredient.objects.get(recipe=self.recipes[0],
+                                           ingredient=self.salt)
+        row.amount = 5
+        row.save()
+        self.assert_totals({self.salt.id: 6, self.flour.id: 200})
+
+        row.ingredient = self.flour
+        RecipeIngredient.objects.filter(recipe=self.recipes[0],
+                                        ingredient=self.flour).delete()
+        row.save()
+        self.assert_totals({self.salt.id: 1, self.flour.id: 5})
+
+        RecipeIngredient.objects.create(recipe=self.recipes[1],
+                                        ingredient=self.flour, amount=10)
+        self.assert_totals({self.salt.id: 1, self.flour.id: 15})
+
+    def test_recipe_updated_through_api(self):
+        client = APIClient()
+        client.force_authenticate(self.recipes[0].author)
+        response = client.patch(
+            f'/api/recipes/{self.recipes[0].id}/',
+            {
+                'name': 'Новый рецепт', 'text': 'Описание',
+                'cooking_time': 10, 'tags': [self.tag.id],
+                'ingredients': [{'id': self.salt.id, 'amount': 3}],
+            },
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assert_totals({self.salt.id: 4})
+
+    def test_recipe_deleted_through_api(self):
+        client = APIClient()
+        client.force_authenticate(self.recipes[1].author)
+        response = client.delete(f'/api/recipes/{self.recipes[1].id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assert_totals({self.salt.id: 1, self.flour.id: 200})
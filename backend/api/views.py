@@ -1,5 +1,8 @@
-from django.db.models import F, Sum
-from django.http import HttpResponse
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import (BooleanField, Count, Exists, F, OuterRef,
+                              Prefetch, Subquery, Value)
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 
@@ -7,27 +10,40 @@ from rest_framework import status, views, viewsets
 from rest_framework.authtoken.models import Token
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.decorators import action
-from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from rest_framework.parsers import JSONParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
-from recipes.models import (Ingredient, Recipe, RecipeIngredient,
-                            RecipeUserFavorites, Tag)
+from recipes.models import Ingredient, Recipe, RecipeUserFavorites, Tag
 from users.models import ShoppingCart, Subscription, User
 
+from .cache import cached_anonymous_response, catalog_response
 from .filters import IngredientFilter, RecipeFilter
-from .paginators import CustomPageNumberPagination
+from .paginators import (CursorOrPageNumberPagination,
+                         CustomPageNumberPagination, FeedCursorPagination)
+from .parsers import RecipeImportParser, RecipeMultiPartParser
 from .permissions import ReadOrAuthorOrAdmin
-from .serializers import (IngredientSerializer, PasswordChangeSerializer,
-                          RecipeSerializer, RecipeShortInfo,
-                          SubscriptionSerializer, TagSerializer,
-                          UserSerializer)
+from .recipe_import import import_recipes
+from .renderers import SHOPPING_CART_RENDERERS
+from .search import search_ingredients
+from .serializers import (IngredientSerializer, LoginSerializer,
+                          PasswordChangeSerializer, RecipeSerializer,
+                          RecipeShortInfo, SubscriptionSerializer,
+                          TagSerializer, UserSerializer)
+from .shopping_cart import (CONTENT_TYPES, recipe_amounts,
+                            stream_shopping_cart, update_cart_totals)
 
 
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
 
+    def list(self, request, *args, **kwargs):
+        return catalog_response(request, 'tag', self.queryset,
+                                self.serializer_class)
+
 
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
@@ -35,18 +51,114 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
 
+    def list(self, request, *args, **kwargs):
+        params = request.query_params
+        if 'name' in params and set(params) <= {'name', 'fuzzy'}:
+            return Response(search_ingredients(
+                params['name'],
+                fuzzy=params.get('fuzzy') in ('1', 'true', 'True'),
+            ))
+        if request.query_params:
+            return super().list(request, *args, **kwargs)
+        return catalog_response(request, 'ingredient', self.queryset,
+                                self.serializer_class)
+
 
 class RecipeViewSet(viewsets.ModelViewSet):
     serializer_class = RecipeSerializer
-    pagination_class = CustomPageNumberPagination
+    pagination_class = CursorOrPageNumberPagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
     permission_classes = (ReadOrAuthorOrAdmin,)
+    parser_classes = (JSONParser, RecipeMultiPartParser)
 
     def get_queryset(self):
-        queryset = Recipe.objects.all()
+        queryset = self.annotate_user_flags(Recipe.objects.all())
         return self.get_serializer_class().setup_eager_loading(queryset)
 
+    @cached_anonymous_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cached_anonymous_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @action(
+        detail=False,
+        methods=['post'],
+        permission_classes=[IsAuthenticated],
+        parser_classes=[RecipeImportParser],
+    )
+    def bulk(self, request):
+        """
+        Пакетная загрузка рецептов: список в формате RecipeSerializer.
+        """
+        items = request.data
+        if not isinstance(items, list):
+            return Response(
+                data={'errors': 'Ожидается список рецептов'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        max_items = settings.RECIPE_IMPORT_MAX_ITEMS
+        if len(items) > max_items:
+            return Response(
+                data={'errors': 'Слишком много рецептов в одном запросе, '
+                                f'максимум {max_items}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results, created = import_recipes(
+            items, request.user, self.get_serializer_context()
+        )
+        return Response(
+            results,
+            status=(status.HTTP_201_CREATED if created
+                    else status.HTTP_400_BAD_REQUEST)
+        )
+
+    @action(
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        pagination_class=FeedCursorPagination,
+    )
+    def feed(self, request):
+        """
+        Рецепты авторов из подписок, новые первыми. Страница берется
+        из ленты пользователя, рецепты загружаются по ее id.
+        """
+        page = self.paginate_queryset(request.user.feed_entries.all())
+        recipes = self.get_queryset().in_bulk(
+            [entry.recipe_id for entry in page]
+        )
+        serializer = self.get_serializer(
+            [recipes[entry.recipe_id] for entry in page
+             if entry.recipe_id in recipes],
+            many=True
+        )
+        return self.get_paginated_response(serializer.data)
+
+    def annotate_user_flags(self, queryset):
+        """
+        Флаги is_favorited и is_in_shopping_cart вычисляются
+        подзапросами в основном запросе, а не отдельно для каждого рецепта.
+        """
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset.annotate(
+                is_favorited=Value(False, output_field=BooleanField()),
+                is_in_shopping_cart=Value(False, output_field=BooleanField()),
+            )
+
+        return queryset.annotate(
+            is_favorited=Exists(RecipeUserFavorites.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+        )
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
@@ -79,7 +191,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
             )
 
         serializer = RecipeShortInfo(recipe)
-        RecipeUserFavorites.objects.create(user=user, recipe=recipe)
+        with transaction.atomic():
+            RecipeUserFavorites.objects.create(user=user, recipe=recipe)
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -92,7 +205,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
             recipe=recipe
         )
         if fav_recipe.exists():
-            fav_recipe.delete()
+            with transaction.atomic():
+                fav_recipe.delete()
             return Response(status=status.HTTP_204_NO_CONTENT)
 
         return Response(data={'errors': 'Этого рецепта нет в избранном'},
@@ -126,7 +240,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        ShoppingCart.objects.create(user=user, recipe=recipe)
+        with transaction.atomic():
+            ShoppingCart.objects.create(user=user, recipe=recipe)
+            update_cart_totals([user.id], recipe_amounts(recipe))
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def delete_from_cart(self, user, recipe):
@@ -138,7 +254,9 @@ class RecipeViewSet(viewsets.ModelViewSet):
             recipe=recipe
         )
         if cart_recipe.exists():
-            cart_recipe.first().delete()
+            with transaction.atomic():
+                cart_recipe.first().delete()
+                update_cart_totals([user.id], recipe_amounts(recipe, -1))
             return Response(status=status.HTTP_204_NO_CONTENT)
 
         return Response(
@@ -146,28 +264,26 @@ class RecipeViewSet(viewsets.ModelViewSet):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    @action(detail=False)
+    @action(
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        renderer_classes=SHOPPING_CART_RENDERERS,
+    )
     def download_shopping_cart(self, request):
-        ingredients = (
-            RecipeIngredient.objects.filter(
-                recipe__in=(request.user.shopping_cart.values('id'))
-            ).values(
-                name=F('ingredient__name'),
-                unit=F('ingredient__measurement_unit')
-            ).annotate(amount=Sum('amount'))
+        file_format = request.accepted_renderer.format
+        ingredients = request.user.cart_ingredients.values(
+            'amount',
+            name=F('ingredient__name'),
+            unit=F('ingredient__measurement_unit'),
+        ).order_by('name')
+
+        response = StreamingHttpResponse(
+            stream_shopping_cart(ingredients.iterator(), file_format),
+            content_type=CONTENT_TYPES[file_format]
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename=cart.{file_format}'
         )
-
-        content = ''
-        for ing in ingredients:
-            content += (
-                f'{ing["name"]}'
-                f' - {ing["amount"]}'
-                f' {ing["unit"]}\r\n'
-            )
-
-        response = HttpResponse(content,
-                                content_type='text/plain,charset=utf8')
-        response['Content-Disposition'] = 'attachment; filename=cart.txt'
         return response
 
 
@@ -202,10 +318,16 @@ class UserViewSet(viewsets.ModelViewSet):
 
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-    @action(detail=False)
+    @action(detail=False, pagination_class=CursorOrPageNumberPagination)
     def subscriptions(self, request):
         following = Subscription.objects.filter(follower=request.user)
-        queryset = User.objects.filter(following__in=following)
+        queryset = User.objects.filter(
+            following__in=following
+        ).annotate(
+            recipes_count=Count('recipes', distinct=True)
+        ).prefetch_related(
+            Prefetch('recipes', queryset=self.get_limited_recipes(request))
+        ).order_by('-pk')
 
         page = self.paginate_queryset(queryset)
         if page is not None:
@@ -216,6 +338,20 @@ class UserViewSet(viewsets.ModelViewSet):
 
         return Response(serializer.data, status=status.HTTP_200_OK)
 
+    def get_limited_recipes(self, request):
+        """
+        Рецепты авторов с учетом recipes_limit: первые N рецептов
+        каждого автора выбираются одним запросом.
+        """
+        limit = request.query_params.get('recipes_limit')
+        if not (isinstance(limit, str) and limit.isnumeric()):
+            return Recipe.objects.all()
+
+        top_recipes = Recipe.objects.filter(
+            author=OuterRef('author')
+        ).values('pk')[:int(limit)]
+        return Recipe.objects.filter(pk__in=Subquery(top_recipes))
+
     def get_subscribtion_serializer(self, *args, **kwargs):
         kwargs.setdefault(
             'context',
@@ -277,15 +413,43 @@ class UserViewSet(viewsets.ModelViewSet):
 
 
 class CustomAuthToken(ObtainAuthToken):
+    serializer_class = LoginSerializer
+
     def post(self, request, *args, **kwargs):
-        user = get_object_or_404(User, email=request.data['email'])
-        request.data['username'] = user.username
+        """
+        Пользователь загружается одним запросом вместе с токеном;
+        токен создается, только если его еще нет.
+        """
         serializer = self.serializer_class(data=request.data,
                                            context={'request': request})
         serializer.is_valid(raise_exception=True)
-        user = serializer.validated_data['user']
-        token, created = Token.objects.get_or_create(user=user)
-        return Response({'auth_token': token.key})
+        user = get_object_or_404(
+            User.objects.select_related('auth_token'),
+            email=serializer.validated_data['email']
+        )
+        password = serializer.validated_data['password']
+        if not user.is_active or not user.check_password(password):
+            raise ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [
+                    'Невозможно войти с предоставленными учетными данными'
+                ]},
+                code='authorization'
+            )
+
+        return Response({'auth_token': self.get_token(user).key})
+
+    @staticmethod
+    def get_token(user):
+        try:
+            return user.auth_token
+        except Token.DoesNotExist:
+            pass
+        try:
+            with transaction.atomic():
+                return Token.objects.create(user=user)
+        except IntegrityError:
+            # Токен успел создать параллельный вход.
+            return Token.objects.get(user=user)
 
 
 class Logout(views.APIView):
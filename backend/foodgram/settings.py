@@ -83,6 +83,19 @@ else:
         }
     }
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+RECIPES_CACHE_TIMEOUT = int(os.getenv('RECIPES_CACHE_TIMEOUT', 300))
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.getenv('AUTH_TOKEN_CACHE_TIMEOUT', 300))
+
 AUTH_USER_MODEL = 'users.User'
 
 REST_FRAMEWORK = {
@@ -91,7 +104,7 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
 
     'PAGE_SIZE': 10,
@@ -128,10 +141,28 @@ STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+DEFAULT_FILE_STORAGE = 'recipes.storage.ContentAddressedStorage'
 
 
 MAX_COOKING_TIME = 900
 MIN_COOKING_TIME = 1
 MAX_INGREDIENT_AMOUNT = 2999
 MIN_INGREDIENT_AMOUNT = 1
-
+INGREDIENT_SEARCH_LIMIT = 50
+RECIPE_IMPORT_MAX_ITEMS = 1000
+RECIPE_IMPORT_BATCH_SIZE = 500
+# Не больше client_max_body_size для /api/recipes/bulk/ в nginx.
+RECIPE_IMPORT_MAX_BODY_SIZE = 200 * 1024 * 1024
+FEED_FANOUT_SYNC_LIMIT = 1000
+FEED_BATCH_SIZE = 1000
+FEED_WORKERS = int(os.getenv('FEED_WORKERS', 1))
+RECIPE_IMAGE_RENDITIONS = {
+    'thumbnail': {'size': (400, 400), 'crop': True, 'format': 'JPEG'},
+    'thumbnail_webp': {'size': (400, 400), 'crop': True, 'format': 'WEBP'},
+    'webp': {'size': (1280, 1280), 'crop': False, 'format': 'WEBP'},
+}
+RECIPE_IMAGE_QUALITY = 80
+RECIPE_IMAGE_MAX_SIZE = int(
+    os.getenv('RECIPE_IMAGE_MAX_SIZE', 10 * 1024 * 1024)
+)
+RECIPE_IMAGE_WORKERS = int(os.getenv('RECIPE_IMAGE_WORKERS', 2))
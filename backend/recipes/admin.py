@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.db.models import Exists, OuterRef, Q
 
 from .models import (Ingredient, Recipe, RecipeIngredient, RecipeTag,
                      RecipeUserFavorites, Tag)
@@ -7,6 +8,7 @@ from .models import (Ingredient, Recipe, RecipeIngredient, RecipeTag,
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
     list_display = ('pk', 'name', 'slug', 'color')
+    search_fields = ('name', 'slug')
 
 
 @admin.register(Ingredient)
@@ -17,15 +19,18 @@ class IngredientAdmin(admin.ModelAdmin):
 
 class RecipeTagTabular(admin.TabularInline):
     model = RecipeTag
+    autocomplete_fields = ('tag',)
 
 
 class RecipeIngredientTabular(admin.TabularInline):
     model = RecipeIngredient
+    autocomplete_fields = ('ingredient',)
 
 
 @admin.register(RecipeIngredient)
 class RecipeIngredient(admin.ModelAdmin):
     list_display = ('pk', 'recipe', 'ingredient', 'amount')
+    autocomplete_fields = ('recipe', 'ingredient')
 
 
 @admin.register(Recipe)
@@ -43,11 +48,31 @@ class RecipeAdmin(admin.ModelAdmin):
                      'author__username',
                      'author__first_name',
                      'author__last_name',
-                     'recipetag__tag__name',
                      )
+    list_select_related = ('author',)
 
     inlines = [RecipeTagTabular, RecipeIngredientTabular]
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(
+            'tags', 'ingredients'
+        )
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Поиск по полям search_fields и по названию тега. Тег ищется
+        подзапросом EXISTS, поэтому строки рецептов не дублируются
+        и DISTINCT не нужен.
+        """
+        for bit in search_term.split():
+            condition = Q(Exists(RecipeTag.objects.filter(
+                recipe=OuterRef('pk'), tag__name__icontains=bit
+            )))
+            for field in self.search_fields:
+                condition |= Q(**{f'{field}__icontains': bit})
+            queryset = queryset.filter(condition)
+        return queryset, False
+
     def get_tags(self, obj):
         return ",\n".join([tag.name for tag in obj.tags.all()])
 
@@ -55,16 +80,18 @@ class RecipeAdmin(admin.ModelAdmin):
         return ",\n".join([ing.name for ing in obj.ingredients.all()])
 
     def get_favorited_count(self, obj):
-        return obj.favorited_count
+        return obj.favorites_count
 
     get_tags.short_description = 'Теги'
     get_ingredients.short_description = 'Ингредиенты'
     get_favorited_count.short_description = 'В избранном'
+    get_favorited_count.admin_order_field = 'favorites_count'
 
 
 @admin.register(RecipeTag)
 class RecipeTagAdmin(admin.ModelAdmin):
     list_display = ('pk', 'recipe', 'tag',)
+    autocomplete_fields = ('recipe', 'tag')
 
 
 @admin.register(RecipeUserFavorites)
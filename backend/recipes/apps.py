@@ -1,6 +1,17 @@
 from django.apps import AppConfig
+from django.db import connections
+from django.db.models.signals import post_migrate
+
+
+def restore_fulltext_triggers(sender, using, **kwargs):
+    from .fulltext import restore_sqlite_triggers
+    restore_sqlite_triggers(connections[using])
 
 
 class RecipesConfig(AppConfig):
     name = 'recipes'
     verbose_name = 'Рецепты'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        post_migrate.connect(restore_fulltext_triggers, sender=self)
@@ -0,0 +1,115 @@
+"""
+Полнотекстовый поиск рецептов по названию и описанию.
+
+PostgreSQL: хранимая вычисляемая колонка search_vector (tsvector
+с русской морфологией, название весомее описания) и GIN-индекс.
+SQLite: FTS5-таблица без хранимого текста, которую обновляют триггеры.
+Колонки и таблицы нет в модели: их создает миграция 0010.
+"""
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+TABLE = 'recipes_recipe'
+FTS_TABLE = 'recipes_recipe_fts'
+FTS_TRIGGERS = ('recipes_recipe_fts_insert', 'recipes_recipe_fts_delete',
+                'recipes_recipe_fts_update')
+
+
+def sqlite_fold(column):
+    """
+    unicode61 снимает диакритику только с латиницы: ё приводим к е сами.
+    """
+    return f"replace(replace({column}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+SQLITE_INSERT = (
+    f"INSERT INTO {FTS_TABLE} (rowid, name, text) "
+    f"VALUES (new.id, {sqlite_fold('new.name')}, {sqlite_fold('new.text')});"
+)
+SQLITE_DELETE = (
+    f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rowid, name, text) "
+    f"VALUES ('delete', old.id, {sqlite_fold('old.name')}, "
+    f"{sqlite_fold('old.text')});"
+)
+SQLITE_TRIGGERS = (
+    f"""
+    CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_insert
+    AFTER INSERT ON {TABLE} BEGIN {SQLITE_INSERT} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_delete
+    AFTER DELETE ON {TABLE} BEGIN {SQLITE_DELETE} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS recipes_recipe_fts_update
+    AFTER UPDATE OF name, text ON {TABLE} BEGIN
+        {SQLITE_DELETE} {SQLITE_INSERT}
+    END
+    """,
+    f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('delete-all')",
+    f"INSERT INTO {FTS_TABLE} (rowid, name, text) "
+    f"SELECT id, {sqlite_fold('name')}, {sqlite_fold('text')} FROM {TABLE}",
+)
+
+
+def restore_sqlite_triggers(db):
+    """
+    SQLite пересоздает таблицу при изменении ее схемы в миграциях,
+    и триггеры пропадают. Создает их заново, как миграция 0010,
+    и переиндексирует FTS-таблицу.
+    """
+    if db.vendor != 'sqlite':
+        return
+    with db.cursor() as cursor:
+        cursor.execute(
+            "SELECT type, name FROM sqlite_master "
+            "WHERE name = %s OR type = 'trigger' AND tbl_name = %s",
+            [FTS_TABLE, TABLE]
+        )
+        existing = {name for _, name in cursor.fetchall()}
+        if FTS_TABLE in existing and not set(FTS_TRIGGERS) <= existing:
+            for sql in SQLITE_TRIGGERS:
+                cursor.execute(sql)
+
+
+def sqlite_match(query):
+    """
+    Запрос FTS5 из слов пользователя: все слова, каждое как префикс.
+    Служебный синтаксис FTS5 в запрос не попадает.
+    """
+    words = re.findall(r'\w+', query.lower().replace('ё', 'е'))
+    return ' '.join('"{}"*'.format(word) for word in words)
+
+
+def search(queryset, query):
+    """
+    Оставляет рецепты, подходящие под запрос, и сортирует
+    их по релевантности (аннотация rank, больше — лучше).
+    """
+    if connection.vendor == 'postgresql':
+        tsquery = "websearch_to_tsquery('russian', %s)"
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT id FROM {TABLE} WHERE search_vector @@ {tsquery}',
+            [query]
+        )).annotate(rank=RawSQL(
+            f'ts_rank({TABLE}.search_vector, {tsquery})',
+            [query], output_field=FloatField()
+        )).order_by('-rank', '-pk')
+
+    if connection.vendor == 'sqlite':
+        match = sqlite_match(query)
+        if not match:
+            return queryset.none()
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [match]
+        )).annotate(rank=RawSQL(
+            f'SELECT -bm25({FTS_TABLE}, 10.0, 1.0) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = {TABLE}.id',
+            [match], output_field=FloatField()
+        )).order_by('-rank', '-pk')
+
+    return queryset.filter(Q(name__icontains=query) | Q(text__icontains=query))
@@ -0,0 +1,62 @@
+import posixpath
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipes.models import Recipe
+from recipes.renditions import rendition_paths
+
+IMAGES_DIR = 'recipe_images'
+
+
+def walk(storage, directory):
+    directories, files = storage.listdir(directory)
+    for name in files:
+        yield posixpath.join(directory, name)
+    for name in directories:
+        yield from walk(storage, posixpath.join(directory, name))
+
+
+def referenced_images():
+    names = set()
+    recipes = Recipe.objects.values_list('image', 'image_renditions')
+    for image, renditions in recipes.iterator():
+        names.add(image)
+        names.update(rendition_paths(renditions or {}))
+    return names
+
+
+class Command(BaseCommand):
+    help = ('Удаляет файлы изображений, на которые не ссылается '
+            'ни один рецепт')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age', type=int, default=24 * 60 * 60,
+            help='Не трогать файлы моложе стольких секунд'
+        )
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        if not default_storage.exists(IMAGES_DIR):
+            return
+
+        # Список ссылок собирается до обхода файлов: файл, загруженный
+        # позже, защищен порогом --min-age.
+        referenced = referenced_images()
+        threshold = timezone.now() - timedelta(seconds=options['min_age'])
+        deleted = 0
+        for name in walk(default_storage, IMAGES_DIR):
+            if name in referenced:
+                continue
+            if default_storage.get_modified_time(name) > threshold:
+                continue
+            if not options['dry_run']:
+                default_storage.delete(name)
+            deleted += 1
+            self.stdout.write(name)
+
+        action = 'Найдено' if options['dry_run'] else 'Удалено'
+        self.stdout.write(f'{action} файлов без ссылок: {deleted}')
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+from recipes.renditions import needs_renditions, update_renditions
+
+
+class Command(BaseCommand):
+    help = ('Создает уменьшенные копии изображений рецептов, '
+            'у которых их еще нет')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Пересоздать копии для всех рецептов')
+
+    def handle(self, *args, **options):
+        done = failed = 0
+        recipes = Recipe.objects.exclude(image='').only(
+            'pk', 'image', 'image_renditions'
+        )
+        for recipe in recipes.iterator():
+            if not options['all'] and not needs_renditions(recipe):
+                continue
+            try:
+                update_renditions(recipe.pk, recipe.image.name)
+            except OSError as error:
+                failed += 1
+                self.stderr.write(f'{recipe.image.name}: {error}')
+            else:
+                done += 1
+        self.stdout.write(f'Обработано рецептов: {done}, ошибок: {failed}')
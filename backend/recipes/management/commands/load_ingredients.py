@@ -0,0 +1,107 @@
+import csv
+import json
+import os
+import re
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.cache import invalidate_catalog, invalidate_catalog_data
+from recipes.models import Ingredient
+
+FIELDS = ('name', 'measurement_unit')
+SEPARATORS = re.compile(r'[\s,]*')
+
+
+def read_csv(file):
+    for row in csv.DictReader(file):
+        yield row
+
+
+def read_json(file, chunk_size=1 << 16):
+    """
+    Потоково читает JSON-массив объектов, не загружая файл целиком.
+    """
+    decoder = json.JSONDecoder()
+    buffer = file.read(chunk_size).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('Ожидается JSON-массив')
+
+    position = 1
+    while True:
+        position = SEPARATORS.match(buffer, position).end()
+        if buffer.startswith(']', position):
+            return
+        try:
+            row, position = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                raise CommandError('Некорректный JSON')
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        yield row
+
+
+READERS = {
+    '.csv': read_csv,
+    '.json': read_json,
+}
+
+
+def chunked(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = ('Загружает справочник ингредиентов из CSV или JSON '
+            '(name, measurement_unit); существующие строки пропускаются')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Файл .csv или .json, например data/ingredients.csv'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        reader = READERS.get(os.path.splitext(path)[1].lower())
+        if reader is None:
+            raise CommandError('Поддерживаются только файлы .csv и .json')
+
+        count_before = Ingredient.objects.count()
+        started = time.perf_counter()
+        total = 0
+        try:
+            file = open(path, encoding='utf-8')
+        except OSError as error:
+            raise CommandError(f'Не удалось открыть {path}: {error}')
+
+        with file:
+            for chunk in chunked(reader(file), options['batch_size']):
+                Ingredient.objects.bulk_create(
+                    (
+                        Ingredient(**{field: row[field] for field in FIELDS})
+                        for row in chunk
+                    ),
+                    batch_size=options['batch_size'],
+                    ignore_conflicts=True,
+                )
+                total += len(chunk)
+
+        elapsed = time.perf_counter() - started
+        created = Ingredient.objects.count() - count_before
+        invalidate_catalog()
+        invalidate_catalog_data('ingredient')
+        self.stdout.write(
+            f'Прочитано строк: {total}, добавлено: {created}, '
+            f'{total / elapsed if elapsed else total:.0f} строк/с'
+        )
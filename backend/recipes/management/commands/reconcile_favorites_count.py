@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Recipe, RecipeUserFavorites
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счетчики избранного рецептов с таблицей избранного'
+
+    def handle(self, *args, **options):
+        favorites = RecipeUserFavorites.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            total=Count('pk')
+        ).values('total')
+        actual = Coalesce(Subquery(favorites), 0)
+
+        fixed = Recipe.objects.annotate(
+            actual_count=actual
+        ).filter(
+            ~Q(favorites_count=actual)
+        ).update(favorites_count=actual)
+        self.stdout.write(f'Исправлено рецептов: {fixed}')
@@ -0,0 +1,35 @@
+# Generated by Django 3.2.16 on 2026-10-18 20:21
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def fill_favorites_count(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeUserFavorites = apps.get_model('recipes', 'RecipeUserFavorites')
+    favorites = RecipeUserFavorites.objects.filter(
+        recipe=models.OuterRef('pk')
+    ).order_by().values('recipe').annotate(
+        total=models.Count('pk')
+    ).values('total')
+    Recipe.objects.update(
+        favorites_count=Coalesce(
+            models.Subquery(favorites), 0
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_alter_recipeingredient_amount'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='В избранном'),
+        ),
+        migrations.RunPython(fill_favorites_count, migrations.RunPython.noop),
+    ]
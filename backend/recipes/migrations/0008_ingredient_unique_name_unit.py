@@ -0,0 +1,72 @@
+# Generated by Django 3.2.16 on 2026-10-18 20:40
+
+from django.db import migrations, models
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    """
+    Перед созданием ограничения уникальности переносит ссылки
+    с повторяющихся ингредиентов на ингредиент с наименьшим id.
+    """
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    ShoppingCartIngredient = apps.get_model('users', 'ShoppingCartIngredient')
+
+    duplicates = Ingredient.objects.values(
+        'name', 'measurement_unit'
+    ).annotate(
+        keep_id=models.Min('id'), total=models.Count('id')
+    ).filter(total__gt=1)
+
+    for group in duplicates:
+        keep_id = group['keep_id']
+        duplicate_ids = list(
+            Ingredient.objects.filter(
+                name=group['name'],
+                measurement_unit=group['measurement_unit'],
+            ).exclude(id=keep_id).values_list('id', flat=True)
+        )
+
+        for row in RecipeIngredient.objects.filter(
+            ingredient_id__in=duplicate_ids
+        ):
+            kept = RecipeIngredient.objects.filter(
+                recipe_id=row.recipe_id, ingredient_id=keep_id
+            ).exists()
+            if kept:
+                row.delete()
+            else:
+                row.ingredient_id = keep_id
+                row.save(update_fields=['ingredient'])
+
+        for row in ShoppingCartIngredient.objects.filter(
+            ingredient_id__in=duplicate_ids
+        ):
+            updated = ShoppingCartIngredient.objects.filter(
+                user_id=row.user_id, ingredient_id=keep_id
+            ).update(amount=models.F('amount') + row.amount)
+            if updated:
+                row.delete()
+            else:
+                row.ingredient_id = keep_id
+                row.save(update_fields=['ingredient'])
+
+        Ingredient.objects.filter(id__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_favorites_count'),
+        ('users', '0010_shoppingcartingredient'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient-name-unit'),
+        ),
+    ]
@@ -0,0 +1,88 @@
+from django.db import migrations
+
+FOLD_NEW = (
+    "replace(replace(new.name, 'ё', 'е'), 'Ё', 'Е'), "
+    "replace(replace(new.text, 'ё', 'е'), 'Ё', 'Е')"
+)
+FOLD_OLD = (
+    "replace(replace(old.name, 'ё', 'е'), 'Ё', 'Е'), "
+    "replace(replace(old.text, 'ё', 'е'), 'Ё', 'Е')"
+)
+SQLITE_INSERT = (
+    'INSERT INTO recipes_recipe_fts (rowid, name, text) '
+    f'VALUES (new.id, {FOLD_NEW});'
+)
+SQLITE_DELETE = (
+    'INSERT INTO recipes_recipe_fts (recipes_recipe_fts, rowid, name, text) '
+    f"VALUES ('delete', old.id, {FOLD_OLD});"
+)
+
+INSTALL = {
+    'postgresql': (
+        """
+        ALTER TABLE recipes_recipe ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('russian', coalesce(name, '')), 'A')
+            || setweight(to_tsvector('russian', coalesce(text, '')), 'B')
+        ) STORED
+        """,
+        'CREATE INDEX recipes_recipe_search_gin ON recipes_recipe '
+        'USING gin (search_vector)',
+    ),
+    'sqlite': (
+        """
+        CREATE VIRTUAL TABLE recipes_recipe_fts USING fts5(
+            name, text, content='', tokenize='unicode61'
+        )
+        """,
+        f"""
+        CREATE TRIGGER recipes_recipe_fts_insert
+        AFTER INSERT ON recipes_recipe BEGIN {SQLITE_INSERT} END
+        """,
+        f"""
+        CREATE TRIGGER recipes_recipe_fts_delete
+        AFTER DELETE ON recipes_recipe BEGIN {SQLITE_DELETE} END
+        """,
+        f"""
+        CREATE TRIGGER recipes_recipe_fts_update
+        AFTER UPDATE OF name, text ON recipes_recipe BEGIN
+            {SQLITE_DELETE} {SQLITE_INSERT}
+        END
+        """,
+        'INSERT INTO recipes_recipe_fts (rowid, name, text) '
+        "SELECT id, replace(replace(name, 'ё', 'е'), 'Ё', 'Е'), "
+        "replace(replace(text, 'ё', 'е'), 'Ё', 'Е') FROM recipes_recipe",
+    ),
+}
+UNINSTALL = {
+    'postgresql': (
+        'ALTER TABLE recipes_recipe DROP COLUMN search_vector',
+    ),
+    'sqlite': (
+        'DROP TRIGGER IF EXISTS recipes_recipe_fts_insert',
+        'DROP TRIGGER IF EXISTS recipes_recipe_fts_delete',
+        'DROP TRIGGER IF EXISTS recipes_recipe_fts_update',
+        'DROP TABLE IF EXISTS recipes_recipe_fts',
+    ),
+}
+
+
+def run_sql(statements):
+    """
+    SQL для текущей СУБД; на остальных миграция ничего не делает.
+    """
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_image_renditions'),
+    ]
+
+    operations = [
+        migrations.RunPython(run_sql(INSTALL), run_sql(UNINSTALL)),
+    ]
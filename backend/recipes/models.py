@@ -28,6 +28,11 @@ class Ingredient(models.Model):
         verbose_name_plural = 'Ингредиенты'
         ordering = ('name',)
 
+        constraints = [
+            models.UniqueConstraint(fields=['name', 'measurement_unit'],
+                                    name='unique_ingredient-name-unit')
+        ]
+
     def __str__(self) -> str:
         return self.name
 
@@ -41,6 +46,12 @@ class Recipe(models.Model):
     name = models.CharField('Название', max_length=200,)
     text = models.TextField('Описание')
     image = models.ImageField('Изображение', upload_to='recipe_images')
+    image_renditions = models.JSONField(
+        'Уменьшенные копии изображения',
+        default=dict,
+        blank=True,
+        editable=False,
+    )
     cooking_time = models.PositiveSmallIntegerField(
         'Время приготовления',
         validators=(validate_cooking_time,),
@@ -59,6 +70,13 @@ class Recipe(models.Model):
         through='RecipeIngredient',
     )
 
+    favorites_count = models.PositiveIntegerField(
+        'В избранном',
+        default=0,
+        db_index=True,
+        editable=False,
+    )
+
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
@@ -67,10 +85,6 @@ class Recipe(models.Model):
     def __str__(self) -> str:
         return self.name
 
-    @property
-    def favorited_count(self):
-        return RecipeUserFavorites.objects.filter(recipe=self).count()
-
 
 class RecipeTag(models.Model):
     recipe = models.ForeignKey(Recipe,
@@ -0,0 +1,138 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from PIL import Image, ImageOps
+
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS_DIR = 'recipe_images/renditions'
+EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+RESAMPLE = Image.Resampling.LANCZOS
+
+
+@lru_cache(maxsize=None)
+def get_executor():
+    return ThreadPoolExecutor(
+        max_workers=settings.RECIPE_IMAGE_WORKERS,
+        thread_name_prefix='recipe-renditions',
+    )
+
+
+def needs_renditions(recipe):
+    return bool(recipe.image) and (
+        recipe.image_renditions.get('source') != recipe.image.name
+    )
+
+
+def rendition_paths(renditions):
+    return {
+        path for name, path in renditions.items() if name != 'source'
+    }
+
+
+def open_image(name):
+    """
+    Открывает исходник; JPEG декодируется сразу в уменьшенном
+    масштабе, достаточном для самой крупной копии.
+    """
+    largest = max(
+        options['size'] for options in
+        settings.RECIPE_IMAGE_RENDITIONS.values()
+    )
+    with default_storage.open(name) as file:
+        image = Image.open(file)
+        image.draft('RGB', largest)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    return image
+
+
+def render(image, size, crop, format):
+    if crop:
+        image = ImageOps.fit(image, size, RESAMPLE)
+    else:
+        image = image.copy()
+        image.thumbnail(size, RESAMPLE)
+
+    has_alpha = 'A' in image.getbands() or 'transparency' in image.info
+    if format == 'JPEG' and has_alpha:
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.convert('RGBA'))
+        image = background
+    elif image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    buffer = BytesIO()
+    image.save(buffer, format, quality=settings.RECIPE_IMAGE_QUALITY)
+    return buffer.getvalue()
+
+
+def generate_renditions(source):
+    """
+    Сохраняет копии изображения по RECIPE_IMAGE_RENDITIONS
+    и возвращает их пути вместе с именем исходника.
+    """
+    image = open_image(source)
+    stem = os.path.splitext(os.path.basename(source))[0]
+    renditions = {'source': source}
+    for name, options in settings.RECIPE_IMAGE_RENDITIONS.items():
+        path = '{}/{}_{}.{}'.format(
+            RENDITIONS_DIR, stem, name, EXTENSIONS[options['format']]
+        )
+        renditions[name] = default_storage.save(
+            path, ContentFile(render(image, **options))
+        )
+    return renditions
+
+
+def update_renditions(recipe_id, source):
+    """
+    Генерирует копии и записывает их в рецепт, если за это время
+    изображение не сменили. Файлы могут быть общими у нескольких
+    рецептов, поэтому старые копии не удаляются здесь — их убирает
+    команда collect_orphan_images.
+    """
+    renditions = generate_renditions(source)
+    with transaction.atomic():
+        recipe = Recipe.objects.select_for_update().filter(
+            pk=recipe_id, image=source
+        ).first()
+        if recipe is not None:
+            recipe.image_renditions = renditions
+            recipe.save(update_fields=['image_renditions'])
+
+
+def run_update(recipe_id, source):
+    try:
+        update_renditions(recipe_id, source)
+    except Exception:
+        logger.exception('Не удалось создать копии изображения %s', source)
+
+
+def run_in_worker(recipe_id, source):
+    try:
+        run_update(recipe_id, source)
+    finally:
+        connection.close()
+
+
+def schedule_renditions(recipe_id, source):
+    """
+    После фиксации транзакции ставит генерацию копий в пул потоков.
+    При RECIPE_IMAGE_WORKERS = 0 копии создаются сразу.
+    """
+    if settings.RECIPE_IMAGE_WORKERS:
+        transaction.on_commit(
+            lambda: get_executor().submit(run_in_worker, recipe_id, source)
+        )
+    else:
+        transaction.on_commit(lambda: run_update(recipe_id, source))
@@ -0,0 +1,27 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Recipe, RecipeUserFavorites
+from .renditions import needs_renditions, schedule_renditions
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, raw=False, **kwargs):
+    if not raw and needs_renditions(instance):
+        schedule_renditions(instance.pk, instance.image.name)
+
+
+@receiver(post_save, sender=RecipeUserFavorites)
+def favorite_added(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        Recipe.objects.filter(pk=instance.recipe_id).update(
+            favorites_count=F('favorites_count') + 1
+        )
+
+
+@receiver(post_delete, sender=RecipeUserFavorites)
+def favorite_deleted(sender, instance, **kwargs):
+    Recipe.objects.filter(
+        pk=instance.recipe_id, favorites_count__gt=0
+    ).update(favorites_count=F('favorites_count') - 1)
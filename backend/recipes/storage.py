@@ -0,0 +1,41 @@
+import hashlib
+import os
+import posixpath
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Файловое хранилище, в котором имя файла — SHA-256 его содержимого:
+    recipe_images/ab/ab12....png. Одинаковые загрузки дают один файл,
+    а содержимое по имени никогда не меняется.
+    """
+    hash_algorithm = 'sha256'
+
+    def hashed_name(self, name, content):
+        digest = hashlib.new(self.hash_algorithm)
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        digest = digest.hexdigest()
+
+        directory = posixpath.dirname(name.replace('\\', '/'))
+        extension = os.path.splitext(name)[1].lower()
+        return posixpath.join(directory, digest[:2], digest + extension)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+
+        name = self.hashed_name(name, content)
+        if self.exists(name):
+            # Обновляем время изменения, чтобы сборщик мусора
+            # не удалил файл, на который сейчас сошлется новая запись.
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length)
@@ -0,0 +1,67 @@
+from django.test import TestCase
+
+from users.models import User
+
+from .models import Ingredient, Recipe, RecipeIngredient, RecipeTag, Tag
+
+CHANGELIST_URL = '/admin/recipes/recipe/'
+
+
+class RecipeAdminQueriesTest(TestCase):
+    """
+    Список рецептов в админке: число запросов не зависит от числа строк,
+    поиск по тегу не дублирует рецепты.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        cls.tags = [
+            Tag.objects.create(name='Breakfast', slug='breakfast',
+                               color='#E26C2D'),
+            Tag.objects.create(name='Late breakfast', slug='brunch',
+                               color='#49B64E'),
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(name='Соль', measurement_unit='г'),
+            Ingredient.objects.create(name='Мука', measurement_unit='г'),
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def create_recipes(self, count):
+        for i in range(count):
+            recipe = Recipe.objects.create(
+                author=self.admin, name=f'Рецепт {i}', text='Описание',
+                image='recipe_images/test.jpg', cooking_time=10
+            )
+            RecipeTag.objects.bulk_create(
+                RecipeTag(recipe=recipe, tag=tag) for tag in self.tags
+            )
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                                 amount=1)
+                for ingredient in self.ingredients
+            )
+
+    def get_changelist(self, count, **params):
+        with self.assertNumQueries(7):
+            response = self.client.get(CHANGELIST_URL, params)
+        self.assertEqual(response.status_code, 200)
+        results = response.context['cl'].result_list
+        self.assertEqual(len(results), count)
+        return results
+
+    def test_queries_do_not_depend_on_rows(self):
+        self.create_recipes(10)
+        self.get_changelist(10)
+        self.create_recipes(20)
+        self.get_changelist(30)
+
+    def test_tag_search_returns_each_recipe_once(self):
+        self.create_recipes(10)
+        results = self.get_changelist(10, q='breakfast')
+        self.assertEqual(len({recipe.pk for recipe in results}), 10)
@@ -2,7 +2,8 @@ from django.contrib import admin
 from django.contrib.auth.models import Group
 from rest_framework.authtoken.models import TokenProxy
 
-from .models import ShoppingCart, Subscription, User
+from .models import (FeedEntry, ShoppingCart, ShoppingCartIngredient,
+                     Subscription, User)
 
 
 @admin.register(User)
@@ -36,5 +37,25 @@ class ShoppingCartAdmin(admin.ModelAdmin):
                     )
 
 
+@admin.register(ShoppingCartIngredient)
+class ShoppingCartIngredientAdmin(admin.ModelAdmin):
+    list_display = ('pk',
+                    'user',
+                    'ingredient',
+                    'amount',
+                    )
+    list_select_related = ('user', 'ingredient')
+
+
+@admin.register(FeedEntry)
+class FeedEntryAdmin(admin.ModelAdmin):
+    list_display = ('pk',
+                    'user',
+                    'recipe',
+                    'author',
+                    )
+    list_select_related = ('user', 'recipe', 'author')
+
+
 admin.site.unregister(Group)
 admin.site.unregister(TokenProxy)
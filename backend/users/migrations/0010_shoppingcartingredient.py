@@ -0,0 +1,51 @@
+# Generated by Django 3.2.16 on 2026-10-18 20:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_cart_ingredients(apps, schema_editor):
+    ShoppingCart = apps.get_model('users', 'ShoppingCart')
+    ShoppingCartIngredient = apps.get_model('users', 'ShoppingCartIngredient')
+    rows = ShoppingCart.objects.filter(
+        recipe__recipe_ingredients__isnull=False
+    ).values(
+        'user_id',
+        ingredient_id=models.F('recipe__recipe_ingredients__ingredient_id'),
+    ).annotate(
+        amount=models.Sum('recipe__recipe_ingredients__amount')
+    ).order_by()
+    ShoppingCartIngredient.objects.bulk_create(
+        (ShoppingCartIngredient(**row) for row in rows.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_alter_recipeingredient_amount'),
+        ('users', '0009_remove_subscription_нельзя подписаться дважды'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingCartIngredient',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField(default=0, verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cart_ingredients', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Ингредиент списка покупок',
+                'verbose_name_plural': 'Ингредиенты списка покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcartingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_cart-ingredient'),
+        ),
+        migrations.RunPython(fill_cart_ingredients, migrations.RunPython.noop),
+    ]
@@ -73,3 +73,63 @@ class ShoppingCart(models.Model):
         if ShoppingCart.objects.filter(user=self.user,
                                        recipe=self.recipe).exists():
             raise ValidationError('Рецепт уже добавлен в список покупок')
+
+
+class ShoppingCartIngredient(models.Model):
+    """
+    Суммарное количество ингредиента в списке покупок пользователя.
+    Обновляется вместе с ShoppingCart и при изменении рецептов.
+    """
+    user = models.ForeignKey(User,
+                             verbose_name='Пользователь',
+                             on_delete=models.CASCADE,
+                             related_name='cart_ingredients',
+                             )
+    ingredient = models.ForeignKey('recipes.Ingredient',
+                                   verbose_name='Ингредиент',
+                                   on_delete=models.CASCADE,
+                                   )
+    amount = models.PositiveIntegerField('Количество', default=0)
+
+    class Meta:
+        verbose_name = 'Ингредиент списка покупок'
+        verbose_name_plural = 'Ингредиенты списка покупок'
+
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'ingredient'],
+                                    name='unique_cart-ingredient')
+        ]
+
+
+class FeedEntry(models.Model):
+    """
+    Рецепт в ленте подписчика. Записи добавляются при публикации
+    рецепта и при подписке, удаляются при отписке.
+    """
+    user = models.ForeignKey(User,
+                             verbose_name='Подписчик',
+                             on_delete=models.CASCADE,
+                             related_name='feed_entries',
+                             )
+    recipe = models.ForeignKey('recipes.Recipe',
+                               verbose_name='Рецепт',
+                               on_delete=models.CASCADE,
+                               related_name='feed_entries',
+                               )
+    author = models.ForeignKey(User,
+                               verbose_name='Автор',
+                               on_delete=models.CASCADE,
+                               related_name='+',
+                               )
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'recipe'],
+                                    name='unique_feed-recipe')
+        ]
+        indexes = [
+            models.Index(fields=['user', 'author'], name='feed_user_author')
+        ]